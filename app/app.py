@@ -1,21 +1,64 @@
 import streamlit as st
 import duckdb
 import pandas as pd
+import queue, sys
+from contextlib import contextmanager
 from matplotlib.ticker import PercentFormatter
 from pathlib import Path
 import matplotlib.pyplot as plt
+import queries
+from query_cache import QueryCache
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import warehouse
 
 st.set_page_config(page_title="OpsPulse — KPI Dashboard", layout="wide")
 st.title("OpsPulse — KPI Dashboard")
 
-DB = Path(__file__).resolve().parents[1] / "data" / "opspulse.duckdb"
+# Resolved on every rerun, so sessions move to a newly published snapshot on their next interaction.
+DB = warehouse.current_db()
 if not DB.exists():
     st.error("DuckDB not found. Please run: `python run_pipeline.py`")
     st.stop()
 
-con = duckdb.connect(str(DB))
-con.execute("CREATE SCHEMA IF NOT EXISTS analytics;")
-con.execute("SET schema='analytics';")
+# =========================
+# Connections + query cache
+# =========================
+class ConnectionPool:
+    # Read-only connections to one snapshot; many sessions can query it while the pipeline builds the next.
+    def __init__(self, path, size=4):
+        self._idle = queue.Queue()
+        for _ in range(size):
+            con = duckdb.connect(str(path), read_only=True)
+            con.execute("SET schema='analytics';")
+            self._idle.put(con)
+
+    @contextmanager
+    def connection(self):
+        con = self._idle.get()
+        try:
+            yield con
+        finally:
+            self._idle.put(con)
+
+@st.cache_resource
+def query_cache():
+    return QueryCache(max_entries=128)
+
+@st.cache_resource(max_entries=1)
+def connection_pool(db_path):
+    # max_entries=1 drops (and closes) the previous snapshot's pool once sessions switch over.
+    return ConnectionPool(db_path)
+
+build_id = DB.name
+
+def run_query(sql, params):
+    with connection_pool(str(DB)).connection() as con:
+        return con.execute(sql, list(params)).df()
+
+def query(sql, params=()):
+    # Served from memory on reruns; DuckDB is only touched on a miss.
+    return query_cache().get_or_load(build_id, sql, params, lambda: run_query(sql, params))
 
 
 # =========================
@@ -24,11 +67,7 @@ con.execute("SET schema='analytics';")
 st.sidebar.header("Filters")
 
 # Supplier picker supports All or multi-select
-suppliers = con.execute("""
-    SELECT supplier_id, supplier_name
-    FROM dim_supplier ORDER BY supplier_id
-""").df()
-suppliers["label"] = suppliers["supplier_id"].astype(str) + " — " + suppliers["supplier_name"]
+suppliers = queries.suppliers(query)
 
 supplier_labels = st.sidebar.multiselect(
     "Supplier(s)",
@@ -36,6 +75,11 @@ supplier_labels = st.sidebar.multiselect(
     default=["All"]
 )
 
+months = queries.month_range(query)
+start_ym, end_ym = st.sidebar.select_slider(
+    "Months", options=months, value=(months[0], months[-1])
+) if len(months) > 1 else (months[0], months[0])
+
 # Chart options
 smoothing_w = st.sidebar.slider("Smoothing (months)", min_value=1, max_value=6, value=3)
 ontime_target = st.sidebar.slider("On-Time Target (%)", 50, 100, 95)
@@ -51,6 +95,12 @@ def to_sup_ids(labels):
 
 sup_ids = to_sup_ids(supplier_labels)
 
+# Inventory section filters (SKU selection is applied inside the rollup queries)
+skus = queries.skus(query)
+sku_labels = st.sidebar.multiselect("SKU(s)", options=["All"] + skus, default=["All"])
+sku_ids = None if "All" in sku_labels or len(sku_labels) == 0 else sku_labels
+inv_grain = st.sidebar.radio("Inventory grain", ["Weekly", "Monthly"], index=1, horizontal=True)
+
 # =========================
 # Helpers
 # =========================
@@ -59,23 +109,8 @@ def ym_to_ts(df, col="year_month"):
     out[col] = pd.to_datetime(out[col] + "-01")
     return out
 
-def rate_series(df, col):
-    s = df[col].astype(float)
-    if clip_rates:
-        s = s.clip(lower=0.0, upper=1.0)
-    return s
-
-def smooth(df, ycol):
-    if smoothing_w <= 1 or len(df) < 2:
-        df["smooth"] = df[ycol]
-    else:
-        df["smooth"] = df[ycol].rolling(smoothing_w, min_periods=1).mean()
-    return df
-
 def business_line(ax, x, y, title, ylabel="Rate", target=None):
     ax.plot(x, y, linewidth=2, label="Monthly")
-    if "smooth" in y.index or isinstance(y, pd.Series) and "smooth" in y.name:
-        pass  # handled in caller
     ax.set_title(title, fontsize=18, pad=10)
     ax.set_ylabel(ylabel, fontsize=12)
     ax.set_xlabel("Year-Month", fontsize=11)
@@ -86,17 +121,22 @@ def business_line(ax, x, y, title, ylabel="Rate", target=None):
         ax.axhline(target, linestyle="--", linewidth=2, label=f"Target {int(target*100)}%")
     ax.legend(loc="upper right", frameon=True, fancybox=True, shadow=False)
 
-def agg_all_or_filter(df, ids, id_col="supplier_id", how="mean"):
-    if ids is None:
-        # aggregate across all suppliers by month
-        grouped = df.groupby("year_month")[["on_time_rate","fill_rate"]].mean() if {"on_time_rate","fill_rate"}.issubset(df.columns) \
-                   else df.groupby("year_month").mean(numeric_only=True)
-        grouped = grouped.reset_index()
-        grouped[id_col] = "All"
-        cols = [id_col, "year_month"] + [c for c in grouped.columns if c not in [id_col, "year_month"]]
-        return grouped[cols]
+def rate_chart(df, title, target_pct):
+    # One aggregate line (+ smoothed) for "All", otherwise one line per selected supplier.
+    dfp = ym_to_ts(df, "year_month")
+    fig, ax = plt.subplots(figsize=(9,4))
+    if sup_ids is None:
+        ax.plot(dfp["year_month"], dfp["smooth"], linewidth=2, linestyle="--", label=f"{smoothing_w}-mo avg")
+        business_line(ax, dfp["year_month"], dfp["rate"], title, target=target_pct/100)
     else:
-        return df[df[id_col].isin(ids)].copy()
+        for sid, grp in dfp.groupby("supplier_id"):
+            ax.plot(grp["year_month"], grp["rate"], linewidth=2, label=f"Supplier {sid}")
+        ax.axhline(target_pct/100, linestyle="--", linewidth=2, label=f"Target {target_pct}%")
+        ax.set_title(title, fontsize=18, pad=10)
+        ax.set_ylabel("Rate"); ax.set_xlabel("Year-Month")
+        ax.yaxis.set_major_formatter(PercentFormatter(1.0)); ax.set_ylim(0,1.05); ax.grid(True, alpha=.25)
+        ax.legend(loc="upper right", frameon=True, fancybox=True, shadow=False)
+    st.pyplot(fig)
 
 def kpi_card(col, label, value):
     if pd.isna(value):
@@ -105,153 +145,105 @@ def kpi_card(col, label, value):
         col.metric(label, f"{value*100:.1f}%")
 
 # =========================
-# Load Views
+# Load KPIs (filtered and aggregated in DuckDB)
 # =========================
-ot = con.execute("""
-    SELECT supplier_id, year_month, on_time_rate
-    FROM v_kpi_supplier_ontime
-    ORDER BY year_month, supplier_id
-""").df()
-
-fr = con.execute("""
-    SELECT supplier_id, year_month, fill_rate
-    FROM v_kpi_supplier_fillrate
-    ORDER BY year_month, supplier_id
-""").df()
-
-cu = con.execute("""
-    SELECT contract_id, supplier_id, supplier_name, committed_value, actual_spend, utilization_ratio
-    FROM v_kpi_contract_utilization
-    ORDER BY contract_id
-""").df()
-
-sl = con.execute("""
-    SELECT year_month, spend_in_contract, spend_outside_contract, total_spend, leakage_rate
-    FROM v_kpi_spend_leakage
-    ORDER BY year_month
-""").df()
+ot = queries.rate_series(query, "on_time_rate", sup_ids, start_ym, end_ym, smoothing_w, clip_rates)
+fr = queries.rate_series(query, "fill_rate", sup_ids, start_ym, end_ym, smoothing_w, clip_rates)
+cu = queries.contract_utilization(query, sup_ids)
+sl = queries.spend_leakage(query, start_ym, end_ym, smoothing_w, clip_rates)
+cards = queries.latest_cards(query, sup_ids, start_ym, end_ym)
+inv = queries.inventory_series(query, sku_ids, start_ym, end_ym, "week" if inv_grain == "Weekly" else "month")
+inv_skus = queries.inventory_by_sku(query, sku_ids, start_ym, end_ym)
 
 # =========================
 # KPI Cards
 # =========================
-st.title("OpsPulse — KPI Dashboard")
-
-# Latest values (use All or selected)
-def latest_rate(df, col):
-    if df.empty: return float("nan")
-    d = df.sort_values("year_month")
-    return float(d[col].iloc[-1])
-
-ot_view = agg_all_or_filter(ot.copy(), sup_ids)
-fr_view = agg_all_or_filter(fr.copy(), sup_ids)
-
-cur_ot = latest_rate(ot_view, "on_time_rate") if "on_time_rate" in ot_view.columns else float("nan")
-cur_fr = latest_rate(fr_view, "fill_rate") if "fill_rate" in fr_view.columns else float("nan")
-avg_cu = cu["utilization_ratio"].mean() if not cu.empty else float("nan")
-cur_sl = latest_rate(sl.copy(), "leakage_rate") if not sl.empty else float("nan")
-
 c1,c2,c3,c4 = st.columns(4)
-kpi_card(c1, "On-Time (latest)", cur_ot)
-kpi_card(c2, "Fill Rate (latest)", cur_fr)
-kpi_card(c3, "Contract Utilization (avg)", avg_cu)
-kpi_card(c4, "Spend Leakage (latest)", cur_sl)
+kpi_card(c1, "On-Time (latest)", cards["on_time"])
+kpi_card(c2, "Fill Rate (latest)", cards["fill"])
+kpi_card(c3, "Contract Utilization (avg)", cards["utilization"])
+kpi_card(c4, "Spend Leakage (latest)", cards["leakage"])
 
 # =========================
 # On-Time Delivery
 # =========================
 st.subheader("On-Time Delivery Rate (Monthly)")
 
-if not ot_view.empty:
-    dfp = ym_to_ts(ot_view, "year_month")
-    dfp["rate"] = rate_series(dfp, "on_time_rate")
-    dfp = dfp.sort_values(["supplier_id","year_month"])
-    # plot per-supplier when multiple selected, else aggregate line
-    fig, ax = plt.subplots(figsize=(9,4))
-    if sup_ids is None:
-        dfp = smooth(dfp, "rate")
-        ax.plot(dfp["year_month"], dfp["rate"], linewidth=2, label="Monthly")
-        ax.plot(dfp["year_month"], dfp["rate"].rolling(smoothing_w, min_periods=1).mean(),
-                linewidth=2, linestyle="--", label=f"{smoothing_w}-mo avg")
-        business_line(ax, dfp["year_month"], dfp["rate"], "On-Time Delivery Rate", target=ontime_target/100)
-    else:
-        for sid, grp in dfp.groupby("supplier_id"):
-            grp = smooth(grp, "rate")
-            ax.plot(grp["year_month"], grp["rate"], linewidth=2, label=f"Supplier {sid}")
-        ax.axhline(ontime_target/100, linestyle="--", linewidth=2, label=f"Target {ontime_target}%")
-        ax.set_title("On-Time Delivery Rate", fontsize=18, pad=10)
-        ax.set_ylabel("Rate"); ax.set_xlabel("Year-Month")
-        ax.yaxis.set_major_formatter(PercentFormatter(1.0)); ax.set_ylim(0,1.05); ax.grid(True, alpha=.25)
-        ax.legend(loc="upper right", frameon=True, fancybox=True, shadow=False)
-    st.pyplot(fig)
+if not ot.empty:
+    rate_chart(ot, "On-Time Delivery Rate", ontime_target)
 else:
     st.info("No data for selection.")
 
 if show_tables:
-    st.dataframe(ot_view, use_container_width=True)
+    st.dataframe(ot, use_container_width=True)
 
 # =========================
 # Fill Rate
 # =========================
 st.subheader("Fill Rate (Monthly)")
 
-fr_view = ym_to_ts(agg_all_or_filter(fr.copy(), sup_ids), "year_month")
-if not fr_view.empty:
-    fr_view["rate"] = rate_series(fr_view, "fill_rate")
-    fr_view = fr_view.sort_values(["supplier_id","year_month"])
-    fig, ax = plt.subplots(figsize=(9,4))
-    if sup_ids is None:
-        fr_view = smooth(fr_view, "rate")
-        ax.plot(fr_view["year_month"], fr_view["rate"], linewidth=2, label="Monthly")
-        ax.plot(fr_view["year_month"], fr_view["rate"].rolling(smoothing_w, min_periods=1).mean(),
-                linewidth=2, linestyle="--", label=f"{smoothing_w}-mo avg")
-        business_line(ax, fr_view["year_month"], fr_view["rate"], "Fill Rate", target=fill_target/100)
-    else:
-        for sid, grp in fr_view.groupby("supplier_id"):
-            grp = smooth(grp, "rate")
-            ax.plot(grp["year_month"], grp["rate"], linewidth=2, label=f"Supplier {sid}")
-        ax.axhline(fill_target/100, linestyle="--", linewidth=2, label=f"Target {fill_target}%")
-        ax.set_title("Fill Rate", fontsize=18, pad=10)
-        ax.set_ylabel("Rate"); ax.set_xlabel("Year-Month")
-        ax.yaxis.set_major_formatter(PercentFormatter(1.0)); ax.set_ylim(0,1.05); ax.grid(True, alpha=.25)
-        ax.legend(loc="upper right", frameon=True, fancybox=True, shadow=False)
-    st.pyplot(fig)
+if not fr.empty:
+    rate_chart(fr, "Fill Rate", fill_target)
 else:
     st.info("No data for selection.")
 
 if show_tables:
-    st.dataframe(fr_view, use_container_width=True)
+    st.dataframe(fr, use_container_width=True)
 
 # =========================
 # Contract Utilization (table stays)
 # =========================
 st.subheader("Contract Utilization")
-st.dataframe(
-    cu.assign(utilization_pct=(cu["utilization_ratio"]*100).round(1).astype(str)+"%")
-      [["contract_id","supplier_id","supplier_name","committed_value","actual_spend","utilization_pct"]],
-    use_container_width=True
-)
+st.dataframe(cu, use_container_width=True)
 
 # =========================
 # Spend Leakage
 # =========================
 st.subheader("Spend Leakage (Monthly)")
-slp = ym_to_ts(sl.copy(), "year_month")
+slp = ym_to_ts(sl, "year_month")
 if not slp.empty:
-    slp["rate"] = rate_series(slp, "leakage_rate")
-    slp = smooth(slp, "rate")
     fig, ax = plt.subplots(figsize=(9,4))
-    ax.plot(slp["year_month"], slp["rate"], linewidth=2, label="Monthly")
-    ax.plot(slp["year_month"], slp["rate"].rolling(smoothing_w, min_periods=1).mean(),
-            linewidth=2, linestyle="--", label=f"{smoothing_w}-mo avg")
+    ax.plot(slp["year_month"], slp["smooth"], linewidth=2, linestyle="--", label=f"{smoothing_w}-mo avg")
     business_line(ax, slp["year_month"], slp["rate"], "Spend Leakage Over Time", ylabel="Leakage Rate")
     st.pyplot(fig)
 else:
     st.info("No data for selection.")
 
 # =========================
-# Download buttons (unchanged)
+# Inventory Health (weekly/monthly rollups, never the daily fact table)
+# =========================
+st.subheader(f"Inventory Health ({inv_grain})")
+if not inv.empty:
+    invp = ym_to_ts(inv, "period") if inv_grain == "Monthly" else inv
+    col_a, col_b = st.columns(2)
+    fig, ax = plt.subplots(figsize=(9,4))
+    ax.plot(invp["period"], invp["backorder_rate"], linewidth=2, label="Backorder rate")
+    ax.plot(invp["period"], invp["stockout_rate"], linewidth=2, linestyle="--", label="Stockout rate")
+    ax.set_title("Backorder & Stockout Rate", fontsize=18, pad=10)
+    ax.set_ylabel("Share of SKU-days"); ax.set_xlabel("Week" if inv_grain == "Weekly" else "Year-Month")
+    ax.yaxis.set_major_formatter(PercentFormatter(1.0)); ax.set_ylim(0,1.05); ax.grid(True, alpha=.25)
+    ax.legend(loc="upper right", frameon=True, fancybox=True, shadow=False)
+    col_a.pyplot(fig)
+    fig, ax = plt.subplots(figsize=(9,4))
+    ax.plot(invp["period"], invp["days_of_cover"], linewidth=2)
+    ax.set_title("Days of Cover", fontsize=18, pad=10)
+    ax.set_ylabel("Days"); ax.set_xlabel("Week" if inv_grain == "Weekly" else "Year-Month"); ax.grid(True, alpha=.25)
+    col_b.pyplot(fig)
+    st.caption("SKUs by backorder rate")
+    st.dataframe(inv_skus, use_container_width=True)
+else:
+    st.info("No data for selection.")
+
+if show_tables:
+    st.dataframe(inv, use_container_width=True)
+
+# =========================
+# Download buttons (current selection)
 # =========================
 st.download_button("Download On-Time CSV", ot.to_csv(index=False).encode(), "on_time.csv", "text/csv")
 st.download_button("Download Fill Rate CSV", fr.to_csv(index=False).encode(), "fill_rate.csv", "text/csv")
 st.download_button("Download Leakage CSV", sl.to_csv(index=False).encode(), "leakage.csv", "text/csv")
+st.download_button("Download Inventory CSV", inv.to_csv(index=False).encode(), "inventory.csv", "text/csv")
 
+with st.sidebar.expander("Debug"):
+    st.json(query_cache().stats())
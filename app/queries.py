@@ -0,0 +1,131 @@
+# Parameterized dashboard queries. Each function takes `run(sql, params)` (the cached query
+# runner in app.py) and returns only the rows a chart or card needs; supplier filtering,
+# the cross-supplier "All" aggregate and smoothing all happen inside DuckDB. They read the
+# materialized monthly KPI tables and inventory rollups (models/refresh_kpis.py), never the fact tables.
+
+RATE_TABLES = {
+    "on_time_rate": "kpi_supplier_ontime_monthly",
+    "fill_rate": "kpi_supplier_fillrate_monthly",
+}
+
+INVENTORY_TABLES = {
+    "week": ("kpi_inventory_weekly", "week_start"),
+    "month": ("kpi_inventory_monthly", "year_month"),
+}
+
+def list_filter(values, col, sql_type):
+    if values is None:
+        return "TRUE", []
+    return f"list_contains(?::{sql_type}[], {col})", [list(values)]
+
+def supplier_filter(supplier_ids, col="supplier_id"):
+    return list_filter(supplier_ids, col, "INTEGER")
+
+def clamp(expr, clip):
+    return f"LEAST(GREATEST({expr}, 0.0), 1.0)" if clip else expr
+
+def suppliers(run):
+    return run("""
+        SELECT supplier_id, supplier_name,
+               CAST(supplier_id AS VARCHAR) || ' — ' || supplier_name AS label
+        FROM dim_supplier ORDER BY supplier_id
+    """)
+
+def month_range(run):
+    return run("""
+        SELECT DISTINCT year_month FROM (
+          SELECT year_month FROM kpi_supplier_fillrate_monthly
+          UNION ALL SELECT year_month FROM kpi_supplier_ontime_monthly
+        ) ORDER BY 1
+    """)["year_month"].tolist()
+
+def rate_series(run, col, supplier_ids, start, end, window, clip):
+    # Monthly rate per selected supplier, or the cross-supplier mean as supplier_id 'All',
+    # plus a trailing `window`-month average of the (optionally clipped) rate.
+    table = RATE_TABLES[col]
+    where, params = supplier_filter(supplier_ids)
+    if supplier_ids is None:
+        monthly = f"""
+            SELECT 'All' AS supplier_id, year_month, {clamp(f"AVG({col})", clip)} AS rate
+            FROM {table} WHERE year_month BETWEEN ? AND ? GROUP BY year_month"""
+    else:
+        monthly = f"""
+            SELECT CAST(supplier_id AS VARCHAR) AS supplier_id, year_month, {clamp(col, clip)} AS rate
+            FROM {table} WHERE year_month BETWEEN ? AND ? AND {where}"""
+    return run(f"""
+        SELECT supplier_id, year_month, rate,
+               AVG(rate) OVER (PARTITION BY supplier_id ORDER BY year_month
+                               ROWS BETWEEN ? PRECEDING AND CURRENT ROW) AS smooth
+        FROM ({monthly})
+        ORDER BY supplier_id, year_month
+    """, [max(window, 1) - 1, start, end] + params)
+
+def latest_cards(run, supplier_ids, start, end):
+    # Latest in-range month of each KPI (averaged over the selection) in one round trip.
+    where, ids = supplier_filter(supplier_ids)
+    latest = """(SELECT arg_max(r, year_month) FROM (
+                   SELECT year_month, AVG({col}) AS r FROM {table}
+                   WHERE year_month BETWEEN ? AND ? AND {where} GROUP BY 1))"""
+    return run(f"""
+        SELECT {latest.format(col="on_time_rate", table=RATE_TABLES["on_time_rate"], where=where)} AS on_time,
+               {latest.format(col="fill_rate", table=RATE_TABLES["fill_rate"], where=where)} AS fill,
+               (SELECT AVG(utilization_ratio) FROM kpi_contract_utilization) AS utilization,
+               (SELECT arg_max(leakage_rate, year_month) FROM kpi_spend_leakage_by_month
+                WHERE year_month BETWEEN ? AND ?) AS leakage
+    """, [start, end] + ids + [start, end] + ids + [start, end]).iloc[0]
+
+def contract_utilization(run, supplier_ids):
+    where, params = supplier_filter(supplier_ids)
+    return run(f"""
+        SELECT contract_id, supplier_id, supplier_name, committed_value, actual_spend,
+               CAST(ROUND(utilization_ratio * 100, 1) AS VARCHAR) || '%' AS utilization_pct
+        FROM kpi_contract_utilization WHERE {where}
+        ORDER BY contract_id
+    """, params)
+
+def spend_leakage(run, start, end, window, clip):
+    return run(f"""
+        SELECT year_month, spend_in_contract, spend_outside_contract, total_spend, leakage_rate,
+               {clamp("leakage_rate", clip)} AS rate,
+               AVG({clamp("leakage_rate", clip)}) OVER (ORDER BY year_month
+                   ROWS BETWEEN ? PRECEDING AND CURRENT ROW) AS smooth
+        FROM kpi_spend_leakage_by_month
+        WHERE year_month BETWEEN ? AND ?
+        ORDER BY year_month
+    """, [max(window, 1) - 1, start, end])
+
+def skus(run):
+    return run("SELECT DISTINCT sku FROM kpi_inventory_monthly ORDER BY 1")["sku"].tolist()
+
+def inventory_series(run, skus, start, end, grain):
+    # Backorder rate, stockout rate and days of cover per week or month over the selected SKUs,
+    # from the weekly/monthly rollups; the SKU filter runs inside the rollup scan.
+    table, period = INVENTORY_TABLES[grain]
+    where, params = list_filter(skus, "sku", "VARCHAR")
+    return run(f"""
+        SELECT {period} AS period,
+               SUM(backorder_days)::DOUBLE / SUM(days) AS backorder_rate,
+               SUM(stockout_days)::DOUBLE / SUM(days) AS stockout_rate,
+               SUM(end_on_hand) / NULLIF(SUM(usage_sum::DOUBLE / NULLIF(usage_days, 0)), 0) AS days_of_cover,
+               MAX(max_stockout_streak) AS longest_stockout_streak
+        FROM {table}
+        WHERE year_month BETWEEN ? AND ? AND {where}
+        GROUP BY 1 ORDER BY 1
+    """, [start, end] + params)
+
+def inventory_by_sku(run, skus, start, end, limit=20):
+    # SKUs with the highest backorder rate over the range; days of cover as of the last month.
+    where, params = list_filter(skus, "sku", "VARCHAR")
+    return run(f"""
+        SELECT sku,
+               ROUND(SUM(backorder_days)::DOUBLE / SUM(days), 3) AS backorder_rate,
+               SUM(stockout_days) AS stockout_days,
+               MAX(max_stockout_streak) AS longest_stockout_streak,
+               ROUND(arg_max(end_on_hand / NULLIF(usage_sum::DOUBLE / NULLIF(usage_days, 0), 0), year_month), 1)
+                 AS days_of_cover
+        FROM kpi_inventory_monthly
+        WHERE year_month BETWEEN ? AND ? AND {where}
+        GROUP BY sku
+        ORDER BY backorder_rate DESC, sku
+        LIMIT ?
+    """, [start, end] + params + [limit])
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+class QueryCache:
+    # LRU of query results keyed by (sql, params, build id); shared by all dashboard sessions.
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.build_id = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, build_id, sql, params, loader):
+        key = (sql, tuple(tuple(p) if isinstance(p, list) else p for p in params), build_id)
+        with self._lock:
+            if build_id != self.build_id:
+                # A new warehouse build makes every cached result stale.
+                self._entries.clear()
+                self.build_id = build_id
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            if build_id == self.build_id:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "build_id": self.build_id,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
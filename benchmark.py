@@ -0,0 +1,224 @@
+import argparse, json, os, platform, shutil, subprocess, sys, time
+from argparse import Namespace
+from pathlib import Path
+from rss import peak_rss_mb, reset_peak_rss
+
+ROOT = Path(__file__).resolve().parent
+BENCH_DIR = ROOT / "data" / "bench"
+BASELINE_PATH = BENCH_DIR / "scale_baseline.json"
+# Copied into a fresh workspace per scale factor; every module resolves data/ next to its own code,
+# so each scale builds from scratch and the repository's data/ is never touched.
+CODE = ["etl", "ml", "models", "app", "*.py"]
+
+# Only flag slowdowns that are also large in absolute terms; tiny timings are mostly noise.
+MIN_DELTA = {"wall_s": 0.05, "latency_s": 0.005, "peak_rss_mb": 32}
+
+def machine_info():
+    import duckdb, numpy, pandas, pyarrow, sklearn
+    try:
+        memory_gb = round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**30, 1)
+    except (ValueError, OSError, AttributeError):
+        memory_gb = None
+    return {"platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count(), "memory_gb": memory_gb, "python": platform.python_version(),
+            "duckdb": duckdb.__version__, "pyarrow": pyarrow.__version__, "pandas": pandas.__version__,
+            "numpy": numpy.__version__, "sklearn": sklearn.__version__}
+
+# =========================
+# Worker: one scale, run inside its workspace
+# =========================
+def children_peak_rss_mb():
+    # Shard processes started by the generator.
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+def measure(fn):
+    reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    fn()
+    return {"wall_s": round(time.perf_counter() - wall, 4), "cpu_s": round(time.process_time() - cpu, 4),
+            "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 5)
+
+def dashboard_queries(con, repeat):
+    # The queries app/app.py issues on first load, with the "All" selection and with ten suppliers/SKUs.
+    sys.path.insert(0, str(ROOT / "app"))
+    import queries
+    run = lambda sql, params=(): con.execute(sql, list(params)).df()
+    months = queries.month_range(run)
+    start, end = months[0], months[-1]
+    some = queries.suppliers(run)["supplier_id"].head(10).tolist()
+    skus = queries.skus(run)[:10]
+    calls = {
+        "suppliers": lambda: queries.suppliers(run),
+        "month_range": lambda: queries.month_range(run),
+        "skus": lambda: queries.skus(run),
+        "rate_series_ontime_all": lambda: queries.rate_series(run, "on_time_rate", None, start, end, 3, True),
+        "rate_series_fill_all": lambda: queries.rate_series(run, "fill_rate", None, start, end, 3, True),
+        "rate_series_ontime_10_suppliers": lambda: queries.rate_series(run, "on_time_rate", some, start, end, 3, True),
+        "latest_cards": lambda: queries.latest_cards(run, None, start, end),
+        "contract_utilization": lambda: queries.contract_utilization(run, None),
+        "spend_leakage": lambda: queries.spend_leakage(run, start, end, 3, True),
+        "inventory_series_month_all": lambda: queries.inventory_series(run, None, start, end, "month"),
+        "inventory_series_week_10_skus": lambda: queries.inventory_series(run, skus, start, end, "week"),
+        "inventory_by_sku": lambda: queries.inventory_by_sku(run, None, start, end),
+    }
+    return {name: {"latency_s": best_of(repeat, fn)} for name, fn in calls.items()}
+
+def worker(args):
+    import duckdb
+    import run_pipeline, warehouse
+    from transform_validate import CURATED_TABLES, curated_scan
+
+    # The pipeline's own stages, run one at a time so each gets its own timings and memory peak.
+    snapshot = warehouse.Snapshot()
+    stages = {}
+    for stage in run_pipeline.stages(Namespace(scale=args.scale, seed=args.seed, regenerate=True), snapshot):
+        print(f"[BENCH] sf={args.scale:g} {stage.name}", flush=True)
+        stages[stage.name] = measure(stage.run)
+    snapshot.publish()
+
+    con = duckdb.connect(str(warehouse.current_db()), read_only=True)
+    con.execute("SET schema = 'analytics'")
+    rows = {f"curate_{t}": con.execute(f"SELECT COUNT(*) FROM {curated_scan(t)}").fetchone()[0] for t in CURATED_TABLES}
+    source_rows = sum(rows.values())
+    facts = con.execute("SELECT (SELECT COUNT(*) FROM fact_order) + (SELECT COUNT(*) FROM fact_shipment)").fetchone()[0]
+    feature_rows = con.execute("SELECT COUNT(*) FROM v_supplier_daily_features").fetchone()[0]
+    rows.update({"generate": source_rows, "dq": source_rows, "warehouse": source_rows, "kpis": facts,
+                 "features": feature_rows, "labels": feature_rows, "train": feature_rows, "score": feature_rows})
+
+    # Labels come out of the feature query; timed on their own (DuckDB drops the unused feature windows).
+    stages["labels"] = measure(lambda: con.execute(
+        "SELECT COUNT(*), SUM(target_late) FROM supplier_daily_features(DATE '0001-01-01')").fetchall())
+    for name, stats in stages.items():
+        stats["rows"] = rows.get(name)
+        stats["rows_per_s"] = round(stats["rows"] / stats["wall_s"]) if rows.get(name) and stats["wall_s"] else None
+    result = {"scale": args.scale, "stages": stages, "queries": dashboard_queries(con, args.repeat),
+              "rows": {"source": source_rows, "facts": facts, "features": feature_rows},
+              "warehouse_mb": round(warehouse.current_db().stat().st_size / 2**20, 1),
+              "children_peak_rss_mb": round(children_peak_rss_mb(), 1)}
+    con.close()
+    Path(args.out).write_text(json.dumps(result, indent=2))
+
+# =========================
+# Driver
+# =========================
+def workspace(path):
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    for pattern in CODE:
+        for src in ROOT.glob(pattern):
+            if src.is_dir():
+                shutil.copytree(src, path / src.name, ignore=shutil.ignore_patterns("__pycache__"))
+            else:
+                shutil.copy2(src, path / src.name)
+
+def run_scale(scale, args):
+    ws = args.workdir.resolve() / f"sf{scale:g}"
+    workspace(ws)
+    out = ws / "bench_result.json"
+    try:
+        subprocess.run([sys.executable, "benchmark.py", "--worker", "--scale", str(scale), "--seed", str(args.seed),
+                        "--repeat", str(args.repeat), "--out", str(out)], cwd=ws, check=True)
+        return json.loads(out.read_text())
+    finally:
+        if not args.keep:
+            shutil.rmtree(ws, ignore_errors=True)
+
+def metrics(report):
+    # (scale, section, name, metric) -> value for every number compare() looks at.
+    out = {}
+    for scale, r in report["scales"].items():
+        for name, s in r["stages"].items():
+            out[(scale, "stage", name, "wall_s")] = s["wall_s"]
+            out[(scale, "stage", name, "peak_rss_mb")] = s["peak_rss_mb"]
+        for name, q in r["queries"].items():
+            out[(scale, "query", name, "latency_s")] = q["latency_s"]
+    return out
+
+def compare(report, baseline, threshold):
+    if report["machine"].get("cpus") != baseline["machine"].get("cpus") or \
+            report["machine"].get("platform") != baseline["machine"].get("platform"):
+        print("[BENCH] Warning: baseline was recorded on a different machine", baseline["machine"])
+    new, old = metrics(report), metrics(baseline)
+    regressions = []
+    for key in sorted(set(new) & set(old)):
+        a, b = old[key], new[key]
+        if a and b > a * (1 + threshold) and b - a > MIN_DELTA[key[3]]:
+            regressions.append({"scale": key[0], "kind": key[1], "name": key[2], "metric": key[3],
+                                "baseline": a, "current": b, "change": round(b / a - 1, 3)})
+            print(f"[BENCH] REGRESSION sf={key[0]} {key[1]} {key[2]} {key[3]}: {a} -> {b} ({b / a - 1:+.0%})")
+    missing = sorted({k[0] for k in old} - {k[0] for k in new})
+    print(f"[BENCH] Compared {len(set(new) & set(old))} metrics against the baseline "
+          f"(threshold {threshold:.0%}): {len(regressions)} regression(s)"
+          + (f"; scales not rerun: {', '.join(missing)}" if missing else ""))
+    return regressions
+
+def summary(scale, r):
+    stages = r["stages"]
+    total = sum(s["wall_s"] for name, s in stages.items() if name != "labels")
+    peak = max(s["peak_rss_mb"] for s in stages.values())
+    slowest = ", ".join(f"{n} {s['wall_s']:.2f}s" for n, s in sorted(stages.items(), key=lambda kv: -kv[1]["wall_s"])[:3])
+    queries = sum(q["latency_s"] for q in r["queries"].values())
+    print(f"[BENCH] sf={scale}: pipeline {total:.2f}s, peak RSS {peak:.0f} MB, {r['rows']['source']:,} source rows; "
+          f"slowest {slowest}; "
+          f"dashboard queries {queries * 1000:.1f}ms total")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage and dashboard query across scale factors.")
+    parser.add_argument("--scale", type=float, action="append",
+                        help="scale factor to run (repeatable; default: 1, 10, 100; up to 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="generator seed")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per dashboard query (fastest is kept)")
+    parser.add_argument("--workdir", type=Path, default=BENCH_DIR / "workspace", help="where per-scale workspaces are built")
+    parser.add_argument("--keep", action="store_true", help="keep each scale's workspace (code, data, warehouse)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="flag regressions against the baseline")
+    parser.add_argument("--results", type=Path, default=None,
+                        help="compare this saved results file instead of running the benchmark")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return worker(Namespace(scale=args.scale[0], seed=args.seed, repeat=args.repeat, out=args.out))
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    if args.results:
+        report = json.loads(args.results.read_text())
+    else:
+        report = {"run_id": time.strftime("%Y%m%dT%H%M%S"), "machine": machine_info(),
+                  "params": {"seed": args.seed, "repeat": args.repeat}, "scales": {}}
+        for scale in args.scale or [1, 10, 100]:
+            start = time.perf_counter()
+            report["scales"][f"{scale:g}"] = run_scale(scale, args)
+            report["scales"][f"{scale:g}"]["elapsed_s"] = round(time.perf_counter() - start, 2)
+            summary(f"{scale:g}", report["scales"][f"{scale:g}"])
+        out = BENCH_DIR / f"scale_{report['run_id']}.json"
+        out.write_text(json.dumps(report, indent=2))
+        print("[BENCH] Results written to", out)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print("[BENCH] Baseline saved to", args.baseline)
+    if args.compare:
+        if not args.baseline.exists():
+            raise FileNotFoundError(f"[BENCH] No baseline at {args.baseline}; run with --save-baseline first")
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            raise AssertionError(f"[BENCH] {len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
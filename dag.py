@@ -0,0 +1,166 @@
+import hashlib, json, threading, time, uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from rss import peak_rss_mb, reset_peak_rss
+
+def log(msg):
+    # One write per line, so messages from concurrent stages do not interleave mid-line.
+    print(msg + "\n", end="", flush=True)
+
+class Stage:
+    # `inputs`/`outputs` are files or directories; `after` names the stages that must finish first.
+    # A stage is skipped when its key (inputs, params, upstream keys) and its outputs match the last run.
+    def __init__(self, name, run, inputs=(), outputs=(), after=(), params=None):
+        self.name = name
+        self.run = run
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.after = list(after)
+        self.params = params or {}
+
+class FileHashes:
+    # sha256 per file, reused while size and mtime are unchanged so a no-change run does not re-read data.
+    def __init__(self, path):
+        self.path = path
+        self._entries = json.loads(path.read_text()) if path.exists() else {}
+        self._lock = threading.Lock()
+
+    def file(self, path):
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        with self._lock:
+            self._entries[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def tree(self, path):
+        if not path.exists():
+            return None
+        if path.is_file():
+            return self.file(path)
+        digest = hashlib.sha256()
+        for f in sorted(p for p in path.rglob("*") if p.is_file()):
+            digest.update(f.relative_to(path).as_posix().encode())
+            digest.update(self.file(f).encode())
+        return digest.hexdigest()
+
+    def save(self):
+        with self._lock:
+            live = {k: v for k, v in self._entries.items() if Path(k).exists()}
+        self.path.write_text(json.dumps(live))
+
+class Runner:
+    def __init__(self, stages, state_dir, jobs=4):
+        self.stages = {s.name: s for s in stages}
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.state_dir / "state.json"
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        self.hashes = FileHashes(self.state_dir / "file_hashes.json")
+        self.jobs = jobs
+        self.keys = {}
+        self.records = {}
+        # CPU time and peak RSS are process-wide: a stage only gets its own numbers when it ran alone.
+        self._lock = threading.Lock()
+        self._running = set()
+        self._overlapped = set()
+        self._run_peak = 0.0
+
+    def key(self, stage):
+        digest = hashlib.sha256(stage.name.encode())
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for p in stage.inputs:
+            digest.update(f"{p}={self.hashes.tree(p)}".encode())
+        for dep in stage.after:
+            digest.update(f"{dep}={self.keys[dep]}".encode())
+        return digest.hexdigest()
+
+    def output_hashes(self, stage):
+        return {str(p): self.hashes.tree(p) for p in stage.outputs}
+
+    def execute(self, stage, force):
+        key = self.key(stage)
+        self.keys[stage.name] = key
+        last = self.state.get(stage.name)
+        if not force and last and last["key"] == key and last["outputs"] == self.output_hashes(stage):
+            self.records[stage.name] = {"stage": stage.name, "status": "skipped", "key": key[:12]}
+            log(f"[DAG] {stage.name}: up to date")
+            return
+        log(f"[DAG] {stage.name}: running")
+        with self._lock:
+            if self._running:
+                self._overlapped |= self._running | {stage.name}
+            else:
+                self._run_peak = max(self._run_peak, peak_rss_mb())
+                reset_peak_rss()
+            self._running.add(stage.name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            stage.run()
+        finally:
+            wall, cpu, peak = time.perf_counter() - wall, time.process_time() - cpu, peak_rss_mb()
+            with self._lock:
+                self._running.discard(stage.name)
+                self._run_peak = max(self._run_peak, peak)
+                alone = stage.name not in self._overlapped
+            record = {"stage": stage.name, "status": "ran", "key": key[:12], "wall_s": round(wall, 3)}
+            if alone:
+                record.update({"cpu_s": round(cpu, 3), "peak_rss_mb": round(peak, 1)})
+            else:
+                # Shared with the stages it overlapped; see the run-level cpu_s and peak_rss_mb.
+                record.update({"cpu_s": None, "peak_rss_mb": None, "overlapped": True})
+            self.records[stage.name] = record
+        self.state[stage.name] = {"key": key, "outputs": self.output_hashes(stage)}
+
+    def run(self, force=()):
+        # `force` is True (every stage) or a collection of stage names to run regardless of their key.
+        run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        started, cpu = time.perf_counter(), time.process_time()
+        pending = dict(self.stages)
+        done, failed = set(), None
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while pending or running:
+                if failed is None:
+                    for name, stage in list(pending.items()):
+                        if all(d in done for d in stage.after):
+                            forced = force is True or name in force
+                            running[pool.submit(self.execute, stage, forced)] = name
+                            del pending[name]
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        self.records.setdefault(name, {"stage": name})["status"] = "failed"
+                        failed = failed or (name, future.exception())
+                    else:
+                        done.add(name)
+
+        self.hashes.save()
+        log = {
+            "run_id": run_id,
+            "status": "failed" if failed else "ok",
+            "wall_s": round(time.perf_counter() - started, 3),
+            "cpu_s": round(time.process_time() - cpu, 3),
+            "peak_rss_mb": round(max(self._run_peak, peak_rss_mb()), 1),
+            "stages": [self.records[n] for n in self.stages if n in self.records],
+        }
+        runs = self.state_dir / "runs"
+        runs.mkdir(exist_ok=True)
+        (runs / f"{run_id}.json").write_text(json.dumps(log, indent=2))
+        if failed:
+            raise RuntimeError(f"[DAG] stage {failed[0]} failed") from failed[1]
+        return log
+
+    def save(self):
+        # Called once the run's results are published; a failed run leaves every stage due again.
+        self.state_path.write_text(json.dumps(self.state, indent=2))
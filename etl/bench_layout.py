@@ -0,0 +1,121 @@
+import argparse, json, shutil, time
+from datetime import date, datetime
+import duckdb
+import pyarrow.parquet as pq
+from transform_validate import (BASE, CURATED_TABLES, PARTITION_DATES, curated_path, curated_scan,
+                                read_raw, sql_str)
+
+# Compares the partitioned, sorted curated layout with the previous one (a single unsorted file per
+# table with writer defaults). "Bytes scanned" is what a reader that honours Hive partitions and
+# row-group min/max statistics has to read: the compressed size of the queried columns in every
+# row group that survives pruning.
+FLAT = BASE / "bench" / "flat"
+REPORT_PATH = BASE / "bench" / "curated_layout.json"
+
+QUERIES = [
+    # name, table, aggregated column, [first_month, last_month] or None, [first_supplier, last_supplier] or None
+    ("orders_last_3_months", "stg_orders", "qty_ordered", ["2025-07", "2025-09"], None),
+    ("shipments_one_supplier", "stg_shipments", "qty_delivered", None, [1, 1]),
+    ("shipments_10_suppliers_6_months", "stg_shipments", "qty_delivered", ["2025-04", "2025-09"], [1, 10]),
+    ("inventory_one_month", "stg_inventory", "on_hand", ["2025-09", "2025-09"], None),
+]
+
+def write_flat(tables):
+    FLAT.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect()
+    for table in tables:
+        con.execute(f"COPY (SELECT * FROM {read_raw(CURATED_TABLES[table])}) "
+                    f"TO {sql_str((FLAT / f'{table}.parquet').as_posix())} (FORMAT parquet)")
+    con.close()
+
+def as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def month_bounds(months):
+    lo = date.fromisoformat(months[0] + "-01")
+    y, m = map(int, months[1].split("-"))
+    return lo, date(y + m // 12, m % 12 + 1, 1)
+
+def overlaps(stats, lo, hi):
+    # [lo, hi) against a row group's [min, max]; groups without statistics must be read.
+    if stats is None or not stats.has_min_max:
+        return True
+    return as_day(stats.min) < hi and as_day(stats.max) >= lo
+
+def bytes_scanned(files, columns, date_col, months, suppliers):
+    dates = month_bounds(months) if months else None
+    scanned = row_groups = kept = 0
+    for f in files:
+        meta = pq.ParquetFile(f).metadata
+        row_groups += meta.num_row_groups
+        part = dict(p.split("=", 1) for p in f.parent.parts if "=" in p)
+        if months and "year_month" in part and not months[0] <= part["year_month"] <= months[1]:
+            continue
+        for i in range(meta.num_row_groups):
+            rg = meta.row_group(i)
+            chunks = {rg.column(j).path_in_schema: rg.column(j) for j in range(rg.num_columns)}
+            if dates and not overlaps(chunks[date_col].statistics, *dates):
+                continue
+            if suppliers and not overlaps(chunks["supplier_id"].statistics, suppliers[0], suppliers[1] + 1):
+                continue
+            kept += 1
+            scanned += sum(chunks[c].total_compressed_size for c in columns if c in chunks)
+    return scanned, kept, row_groups
+
+def run_query(con, source, col, date_col, months, suppliers, repeat):
+    where = ["TRUE"]
+    if months:
+        lo, hi = month_bounds(months)
+        where.append(f"{date_col} >= DATE '{lo}' AND {date_col} < DATE '{hi}'")
+        if "hive_partitioning" in source:
+            where.append(f"year_month BETWEEN '{months[0]}' AND '{months[1]}'")
+    if suppliers:
+        where.append(f"supplier_id BETWEEN {suppliers[0]} AND {suppliers[1]}")
+    sql = f"SELECT COUNT(*), SUM({col}) FROM {source} WHERE {' AND '.join(where)}"
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = con.execute(sql).fetchone()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bytes scanned for the curated Parquet layouts.")
+    parser.add_argument("--repeat", type=int, default=3, help="query repetitions (best time is kept)")
+    parser.add_argument("--keep-flat", action="store_true", help="keep the single-file copies under data/bench")
+    args = parser.parse_args(argv)
+
+    tables = sorted({q[1] for q in QUERIES})
+    write_flat(tables)
+    con = duckdb.connect()
+    results = []
+    for name, table, col, months, suppliers in QUERIES:
+        date_col = PARTITION_DATES[table]
+        columns = [col, date_col] + (["supplier_id"] if suppliers else [])
+        layouts = {
+            "flat": ([FLAT / f"{table}.parquet"], f"read_parquet({sql_str((FLAT / f'{table}.parquet').as_posix())})"),
+            "partitioned": (sorted(curated_path(table).rglob("*.parquet")), curated_scan(table)),
+        }
+        row = {"query": name, "table": table}
+        for layout, (files, source) in layouts.items():
+            scanned, kept, total = bytes_scanned(files, columns, date_col, months, suppliers)
+            answer, elapsed = run_query(con, source, col, date_col, months, suppliers, args.repeat)
+            row[layout] = {"bytes_scanned": scanned, "row_groups_read": kept, "row_groups": total,
+                           "files": len(files), "query_s": round(elapsed, 4), "result": list(answer)}
+        if row["flat"]["result"] != row["partitioned"]["result"]:
+            raise AssertionError(f"[BENCH] {name}: layouts disagree {row['flat']['result']} vs {row['partitioned']['result']}")
+        results.append(row)
+        flat, part = row["flat"], row["partitioned"]
+        print(f"[BENCH] {name:34s} bytes {flat['bytes_scanned']:>12,} -> {part['bytes_scanned']:>12,} "
+              f"({part['bytes_scanned'] / max(flat['bytes_scanned'], 1):6.1%})  "
+              f"row groups {flat['row_groups_read']}/{flat['row_groups']} -> {part['row_groups_read']}/{part['row_groups']}  "
+              f"time {flat['query_s'] * 1000:.1f}ms -> {part['query_s'] * 1000:.1f}ms")
+    con.close()
+
+    REPORT_PATH.write_text(json.dumps(results, indent=2, default=str))
+    if not args.keep_flat:
+        shutil.rmtree(FLAT)
+    print("[BENCH] Report written to", REPORT_PATH)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse, json, time
+import duckdb
+from pathlib import Path
+from transform_validate import curated_scan
+
+BASE = Path(__file__).resolve().parents[1] / "data"
+CURATED = BASE / "curated"
+REPORT_PATH = CURATED / "dq_report.json"
+SAMPLE_ROWS = 5
+
+class Rule:
+    # `violation` is a predicate over the row `t`; `lookups` joins another curated table, aggregated
+    # to one row per key, as alias -> (table, its key, local key, {column: aggregate}). Rules that
+    # are not row predicates give `count` (an aggregate over the scan) and `sample` (a row filter
+    # only run when the count is non-zero).
+    def __init__(self, name, table, violation=None, lookups=None, count=None, sample=None):
+        self.name = name
+        self.table = table
+        self.violation = violation
+        self.lookups = lookups or {}
+        self.count = count or f"COUNT(*) FILTER (WHERE {violation})"
+        self.sample = sample or f"WHERE {violation}"
+
+def not_null(table, *cols):
+    return [Rule(f"{table}.{c} not null", table, f"t.{c} IS NULL") for c in cols]
+
+def in_range(table, col, lo=None, hi=None):
+    bounds = ([f"t.{col} < {lo}"] if lo is not None else []) + ([f"t.{col} > {hi}"] if hi is not None else [])
+    label = f"{'' if lo is None else f'{lo} <= '}{col}{'' if hi is None else f' <= {hi}'}"
+    return Rule(f"{table}: {label}", table, " OR ".join(bounds))
+
+def unique(table, *cols):
+    # Counted as rows beyond the first per key; a hash aggregate, no sort.
+    key = ", ".join(f"t.{c}" for c in cols)
+    return Rule(f"{table}.({', '.join(cols)}) unique", table,
+                count=f"COUNT(*) - COUNT(DISTINCT ({key}))",
+                sample=f"QUALIFY COUNT(*) OVER (PARTITION BY {key}) > 1")
+
+def foreign_key(table, col, ref, ref_col):
+    alias = f"{ref}_{ref_col}"
+    return Rule(f"{table}.{col} -> {ref}.{ref_col}", table, f"t.{col} IS NOT NULL AND {alias}.k IS NULL",
+                lookups={alias: (ref, ref_col, col, {})})
+
+def ordered(table, earlier, later):
+    return Rule(f"{table}: {earlier} <= {later}", table, f"t.{later} < t.{earlier}")
+
+RULES = [
+    *not_null("dim_suppliers", "supplier_id", "supplier_name"),
+    unique("dim_suppliers", "supplier_id"),
+    in_range("dim_suppliers", "lead_time_days", lo=0),
+    in_range("dim_suppliers", "quality_score", lo=0, hi=1),
+
+    *not_null("stg_contracts", "contract_id", "supplier_id", "start_date", "end_date"),
+    unique("stg_contracts", "contract_id"),
+    foreign_key("stg_contracts", "supplier_id", "dim_suppliers", "supplier_id"),
+    ordered("stg_contracts", "start_date", "end_date"),
+    in_range("stg_contracts", "committed_value", lo=0),
+
+    *not_null("stg_orders", "order_id", "supplier_id", "order_date", "qty_ordered", "unit_price"),
+    unique("stg_orders", "order_id"),
+    foreign_key("stg_orders", "supplier_id", "dim_suppliers", "supplier_id"),
+    foreign_key("stg_orders", "contract_id", "stg_contracts", "contract_id"),
+    in_range("stg_orders", "qty_ordered", lo=0),
+    in_range("stg_orders", "unit_price", lo=0),
+    Rule("stg_orders: shipped qty <= ordered qty", "stg_orders", "shp.qty_delivered > t.qty_ordered",
+         lookups={"shp": ("stg_shipments", "order_id", "order_id", {"qty_delivered": "SUM(qty_delivered)"})}),
+
+    *not_null("stg_shipments", "shipment_id", "order_id", "supplier_id", "shipped_date", "delivered_date",
+              "qty_delivered"),
+    unique("stg_shipments", "shipment_id"),
+    # fact_shipment packs the id into order_id * 100 + part.
+    Rule("stg_shipments.shipment_id = '<order_id>-<part 1..99>'", "stg_shipments",
+         "split_part(t.shipment_id, '-', 1) <> CAST(t.order_id AS VARCHAR) "
+         "OR TRY_CAST(split_part(t.shipment_id, '-', 2) AS INTEGER) NOT BETWEEN 1 AND 99 "
+         "OR TRY_CAST(split_part(t.shipment_id, '-', 2) AS INTEGER) IS NULL"),
+    foreign_key("stg_shipments", "order_id", "stg_orders", "order_id"),
+    ordered("stg_shipments", "shipped_date", "delivered_date"),
+    in_range("stg_shipments", "qty_delivered", lo=0),
+    in_range("stg_shipments", "defect_units", lo=0),
+    ordered("stg_shipments", "defect_units", "qty_delivered"),
+
+    *not_null("stg_inventory", "date", "sku"),
+    unique("stg_inventory", "date", "sku"),
+    in_range("stg_inventory", "on_hand", lo=0),
+    in_range("stg_inventory", "backorder", lo=0),
+]
+
+
+def compile_from(rules):
+    # One FROM clause per table: its rows joined once to each lookup the rules need.
+    lookups = {}
+    for r in rules:
+        for alias, (ref, key, local, cols) in r.lookups.items():
+            lookups.setdefault(alias, (ref, key, local, {}))[3].update(cols)
+    sql = f"{curated_scan(rules[0].table)} t"
+    for alias, (ref, key, local, cols) in lookups.items():
+        values = "".join(f", {expr} AS {c}" for c, expr in cols.items())
+        sql += (f"\n  LEFT JOIN (SELECT {key} AS k{values} FROM {curated_scan(ref)} GROUP BY 1) {alias}"
+                f" ON t.{local} = {alias}.k")
+    return sql
+
+def validate(con=None, rules=RULES, sample_rows=SAMPLE_ROWS):
+    con = con or duckdb.connect()
+    by_table = {}
+    for r in rules:
+        by_table.setdefault(r.table, []).append(r)
+
+    results, scans = [], []
+    for table, table_rules in by_table.items():
+        source = compile_from(table_rules)
+        counts = ", ".join(r.count for r in table_rules)
+        start = time.perf_counter()
+        row = con.execute(f"SELECT COUNT(*), {counts} FROM {source}").fetchone()
+        scan_s = time.perf_counter() - start
+        scans.append({"table": table, "rows": row[0], "rules": len(table_rules), "elapsed_s": round(scan_s, 4)})
+        for r, violations in zip(table_rules, row[1:]):
+            result = {"rule": r.name, "table": table, "violations": violations,
+                      "scan_s": round(scan_s, 4), "sample": []}
+            if violations:
+                # Bad-row samples cost one extra query, and only for failing rules.
+                start = time.perf_counter()
+                sample = con.execute(f"SELECT t.* FROM {source} {r.sample} LIMIT {sample_rows}").df()
+                result["sample"] = json.loads(sample.to_json(orient="records", date_format="iso"))
+                result["sample_s"] = round(time.perf_counter() - start, 4)
+            results.append(result)
+    return {"rules": results, "scans": scans,
+            "failed": sum(1 for r in results if r["violations"]),
+            "elapsed_s": round(sum(s["elapsed_s"] for s in scans), 4)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the data-quality rules over the curated tables.")
+    parser.add_argument("--sample-rows", type=int, default=SAMPLE_ROWS, help="bad rows kept per failing rule")
+    parser.add_argument("--report", type=Path, default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    report = validate(sample_rows=args.sample_rows)
+    args.report.write_text(json.dumps(report, indent=2, default=str))
+    for r in report["rules"]:
+        if r["violations"]:
+            print(f"[DQ] FAILED {r['rule']}: {r['violations']} rows, sample={r['sample'][:2]}")
+    print(f"[DQ] {len(report['rules'])} rules in {len(report['scans'])} scans, "
+          f"{report['failed']} failed, {report['elapsed_s']:.2f}s (report: {args.report})")
+    if report["failed"]:
+        raise AssertionError(f"[DQ] {report['failed']} data-quality rule(s) failed, see {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,198 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from datetime import datetime, timedelta
-import random
-
-random.seed(42)
-np.random.seed(42)
 
 BASE = Path(__file__).resolve().parents[1] / "data"
-BASE.mkdir(parents=True, exist_ok=True)
-
-def random_date(start, end):
-    delta = end - start
-    int_delta = delta.days
-    day = random.randrange(int_delta + 1)
-    return start + timedelta(days=day)
-
-def main():
-    suppliers = []
-    for sid in range(1, 21):
-        suppliers.append({
-            "supplier_id": sid,
-            "supplier_name": f"Supplier {sid:03d}",
-            "country": random.choice(["US", "MX", "CA", "CN", "IN", "VN", "DE"]),
-            "lead_time_days": random.randint(5, 30),
-            "quality_score": round(np.clip(np.random.normal(0.9, 0.05), 0.6, 0.99), 2),
-        })
-    pd.DataFrame(suppliers).to_csv(BASE / "suppliers.csv", index=False)
-
-    start_base = datetime(2024, 1, 1)
-    end_base = datetime(2025, 10, 1)
-    contracts = []
-    for cid in range(1, 31):
-        s_id = random.randint(1, 20)
-        c_start = random_date(start_base, datetime(2025, 1, 1))
-        c_end = c_start + timedelta(days=random.randint(120, 540))
-        committed_value = random.randint(20000, 250000)
-        contracts.append({
-            "contract_id": cid,
-            "supplier_id": s_id,
-            "start_date": c_start.date().isoformat(),
-            "end_date": c_end.date().isoformat(),
-            "committed_value": committed_value,
-            "currency": "USD"
-        })
-    pd.DataFrame(contracts).to_csv(BASE / "contracts.csv", index=False)
-
-    orders = []
-    for oid in range(1, 501):
-        s_id = random.randint(1, 20)
-        order_date = random_date(start_base, end_base)
-        qty = random.randint(10, 1000)
-        unit_price = round(random.uniform(5, 50), 2)
-        possible_contracts = [c["contract_id"] for c in contracts if c["supplier_id"] == s_id]
-        contract_id = random.choice(possible_contracts + [None, None])
-        orders.append({
-            "order_id": oid,
-            "supplier_id": s_id,
-            "order_date": order_date.date().isoformat(),
-            "qty_ordered": qty,
-            "unit_price": unit_price,
-            "contract_id": contract_id
-        })
-    pd.DataFrame(orders).to_csv(BASE / "orders.csv", index=False)
-
-    shipments = []
-    for oid in range(1, 501):
-        num_parts = random.choice([1,1,1,2,2,3])
-        ordered_row = [o for o in orders if o["order_id"] == oid][0]
-        s_id = ordered_row["supplier_id"]
-        base_ship = datetime.fromisoformat(ordered_row["order_date"]) + timedelta(days=random.randint(ordered_row["supplier_id"] % 10 + 5, 40))
-        remaining = ordered_row["qty_ordered"]
-        quality = [s for s in suppliers if s["supplier_id"] == s_id][0]["quality_score"]
-        for part in range(num_parts):
-            ship_qty = remaining if part == num_parts - 1 else random.randint(1, max(1, remaining - (num_parts - part - 1)))
-            remaining -= ship_qty
-            shipped_date = base_ship + timedelta(days=part*random.randint(1,5))
-            delivered_date = shipped_date + timedelta(days=random.randint(0, 5))
-            defects = int(np.random.binomial(ship_qty, 1 - quality))
-            shipments.append({
-                "shipment_id": f"{oid}-{part+1}",
-                "order_id": oid,
-                "supplier_id": s_id,
-                "shipped_date": shipped_date.date().isoformat(),
-                "delivered_date": delivered_date.date().isoformat(),
-                "qty_delivered": ship_qty,
-                "defect_units": defects
-            })
-    pd.DataFrame(shipments).to_csv(BASE / "shipments.csv", index=False)
-
-    inv_rows = []
-    for day_offset in range((end_base - start_base).days + 1):
-        date = (start_base + timedelta(days=day_offset)).date().isoformat()
-        for sku in range(1, 11):
-            on_hand = max(0, int(np.random.normal(500, 150)))
-            backorder = max(0, int(np.random.normal(30, 20)))
-            inv_rows.append({
-                "date": date, "sku": f"SKU-{sku:03d}", "on_hand": on_hand, "backorder": backorder
-            })
-    pd.DataFrame(inv_rows).to_csv(BASE / "inventory.csv", index=False)
+
+START = np.datetime64("2024-01-01", "D")
+END = np.datetime64("2025-10-01", "D")
+CONTRACT_START_MAX = np.datetime64("2025-01-01", "D")
+COUNTRIES = np.array(["US", "MX", "CA", "CN", "IN", "VN", "DE"])
+PARTS_CHOICES = np.array([1, 1, 1, 2, 2, 3])
+
+# Row counts at scale 1.0; every table grows linearly with --scale.
+BASE_SUPPLIERS = 20
+BASE_CONTRACTS = 30
+BASE_ORDERS = 500
+BASE_SKUS = 10
+
+SHARD_ROWS = 1_000_000
+
+def scaled(n, scale):
+    return max(1, int(round(n * scale)))
+
+def random_dates(rng, start, end, size):
+    return start + rng.integers(0, (end - start).astype(int) + 1, size=size)
+
+def part_path(out, table, index):
+    return out / table / f"part-{index:05d}.csv"
+
+def reset_parts(out, table):
+    d = out / table
+    d.mkdir(parents=True, exist_ok=True)
+    for stale in d.glob("part-*.csv"):
+        stale.unlink()
+
+def gen_suppliers(rng, n):
+    sid = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "supplier_id": sid,
+        "supplier_name": [f"Supplier {i:03d}" for i in sid],
+        "country": rng.choice(COUNTRIES, size=n),
+        "lead_time_days": rng.integers(5, 31, size=n),
+        "quality_score": np.clip(rng.normal(0.9, 0.05, size=n), 0.6, 0.99).round(2),
+    })
+
+def gen_contracts(rng, n, n_suppliers):
+    start = random_dates(rng, START, CONTRACT_START_MAX, n)
+    return pd.DataFrame({
+        "contract_id": np.arange(1, n + 1),
+        "supplier_id": rng.integers(1, n_suppliers + 1, size=n),
+        "start_date": start,
+        "end_date": start + rng.integers(120, 541, size=n),
+        "committed_value": rng.integers(20000, 250001, size=n),
+        "currency": "USD",
+    })
+
+def contract_index(contracts, n_suppliers):
+    # Contracts grouped by supplier so each order can pick one with a single gather.
+    order = np.argsort(contracts["supplier_id"].to_numpy(), kind="stable")
+    ids = contracts["contract_id"].to_numpy()[order]
+    counts = np.bincount(contracts["supplier_id"].to_numpy(), minlength=n_suppliers + 1)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return ids, counts, offsets
+
+def gen_orders(rng, first_id, n, n_suppliers, cindex):
+    ids, counts, offsets = cindex
+    sup = rng.integers(1, n_suppliers + 1, size=n)
+    # Same odds as choosing from the supplier's contracts plus two "no contract" slots.
+    pick = (rng.random(n) * (counts[sup] + 2)).astype(np.int64)
+    has_contract = pick < counts[sup]
+    contract = np.where(has_contract, ids[np.minimum(offsets[sup] + pick, len(ids) - 1)], 0)
+    return pd.DataFrame({
+        "order_id": np.arange(first_id, first_id + n),
+        "supplier_id": sup,
+        "order_date": random_dates(rng, START, END, n),
+        "qty_ordered": rng.integers(10, 1001, size=n),
+        "unit_price": rng.uniform(5, 50, size=n).round(2),
+        "contract_id": pd.array(np.where(has_contract, contract, None), dtype="Int64"),
+    })
+
+def gen_shipments(rng, orders, quality):
+    n = len(orders)
+    oid = orders["order_id"].to_numpy()
+    sup = orders["supplier_id"].to_numpy()
+    parts = rng.choice(PARTS_CHOICES, size=n)
+    base_ship = orders["order_date"].to_numpy().astype("datetime64[D]") + rng.integers(sup % 10 + 5, 41)
+    remaining = orders["qty_ordered"].to_numpy().copy()
+
+    frames = []
+    for p in range(PARTS_CHOICES.max()):
+        active = parts > p
+        last = parts == p + 1
+        hi = np.maximum(1, remaining - (parts - p - 1))
+        qty = np.where(last, remaining, rng.integers(1, hi + 1))
+        remaining = remaining - np.where(active, qty, 0)
+        shipped = base_ship + p * rng.integers(1, 6, size=n)
+        delivered = shipped + rng.integers(0, 6, size=n)
+        defects = rng.binomial(np.where(active, qty, 0), 1 - quality[sup])
+        frames.append(pd.DataFrame({
+            "order_id": oid[active],
+            "part": p + 1,
+            "supplier_id": sup[active],
+            "shipped_date": shipped[active],
+            "delivered_date": delivered[active],
+            "qty_delivered": qty[active],
+            "defect_units": defects[active],
+        }))
+
+    ship = pd.concat(frames, ignore_index=True).sort_values(["order_id", "part"], kind="stable")
+    ship.insert(0, "shipment_id", ship["order_id"].astype(str) + "-" + ship["part"].astype(str))
+    return ship.drop(columns="part")
+
+def gen_inventory(rng, days, n_skus):
+    skus = np.array([f"SKU-{i:03d}" for i in range(1, n_skus + 1)])
+    n = len(days) * n_skus
+    return pd.DataFrame({
+        "date": np.repeat(days, n_skus),
+        "sku": np.tile(skus, len(days)),
+        "on_hand": np.maximum(0, rng.normal(500, 150, size=n).astype(np.int64)),
+        "backorder": np.maximum(0, rng.normal(30, 20, size=n).astype(np.int64)),
+    })
+
+def order_shard(index, seed, first_id, n, n_suppliers, cindex, quality, out):
+    rng = np.random.default_rng(seed)
+    orders = gen_orders(rng, first_id, n, n_suppliers, cindex)
+    shipments = gen_shipments(rng, orders, quality)
+    orders.to_csv(part_path(out, "orders", index), index=False, date_format="%Y-%m-%d")
+    shipments.to_csv(part_path(out, "shipments", index), index=False, date_format="%Y-%m-%d")
+    return len(orders), len(shipments)
+
+def inventory_shard(index, seed, days, n_skus, out):
+    rng = np.random.default_rng(seed)
+    inventory = gen_inventory(rng, days, n_skus)
+    inventory.to_csv(part_path(out, "inventory", index), index=False, date_format="%Y-%m-%d")
+    return len(inventory)
+
+def run_shards(fn, tasks, workers):
+    if workers <= 1:
+        return [fn(*t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*tasks)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic OpsPulse raw data.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="scale factor applied to suppliers, contracts, orders, shipments and SKUs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS,
+                        help="orders (or inventory rows) per shard; each shard is one part file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", type=Path, default=BASE)
+    args = parser.parse_args(argv)
+
+    out = args.out
+    out.mkdir(parents=True, exist_ok=True)
+    # Every shard gets its own child seed, so output does not depend on --workers.
+    dim_seed, order_seed, inventory_seed = np.random.SeedSequence(args.seed).spawn(3)
+    rng = np.random.default_rng(dim_seed)
+
+    n_suppliers = scaled(BASE_SUPPLIERS, args.scale)
+    suppliers = gen_suppliers(rng, n_suppliers)
+    suppliers.to_csv(out / "suppliers.csv", index=False)
+    quality = np.concatenate([[0.0], suppliers["quality_score"].to_numpy()])
+
+    contracts = gen_contracts(rng, scaled(BASE_CONTRACTS, args.scale), n_suppliers)
+    contracts.to_csv(out / "contracts.csv", index=False, date_format="%Y-%m-%d")
+    cindex = contract_index(contracts, n_suppliers)
+
+    n_orders = scaled(BASE_ORDERS, args.scale)
+    firsts = range(1, n_orders + 1, args.shard_rows)
+    seeds = order_seed.spawn(len(firsts))
+    reset_parts(out, "orders")
+    reset_parts(out, "shipments")
+    counts = run_shards(order_shard, [
+        (i, seeds[i], first, min(args.shard_rows, n_orders - first + 1), n_suppliers, cindex, quality, out)
+        for i, first in enumerate(firsts)
+    ], args.workers)
+    n_shipments = sum(c[1] for c in counts)
+
+    days = np.arange(START, END + 1)
+    n_skus = scaled(BASE_SKUS, args.scale)
+    days_per_shard = max(1, args.shard_rows // n_skus)
+    day_chunks = [days[i:i + days_per_shard] for i in range(0, len(days), days_per_shard)]
+    seeds = inventory_seed.spawn(len(day_chunks))
+    reset_parts(out, "inventory")
+    n_inventory = sum(run_shards(inventory_shard, [
+        (i, seeds[i], chunk, n_skus, out) for i, chunk in enumerate(day_chunks)
+    ], args.workers))
+
+    print(f"[GEN] scale={args.scale} suppliers={n_suppliers} contracts={len(contracts)} "
+          f"orders={n_orders} shipments={n_shipments} inventory={n_inventory} "
+          f"shards={len(firsts)}+{len(day_chunks)} workers={args.workers} -> {out}")
 
 if __name__ == "__main__":
     main()
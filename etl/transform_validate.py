@@ -1,44 +1,160 @@
-import pandas as pd
+import argparse, os, shutil
+import duckdb
+import pyarrow.dataset as ds
 from pathlib import Path
 
 BASE = Path(__file__).resolve().parents[1] / "data"
 CURATED = BASE / "curated"
 CURATED.mkdir(exist_ok=True, parents=True)
 
-def assert_no_nulls(df, cols, name):
-    null_counts = df[cols].isnull().sum()
-    if null_counts.any():
-        raise AssertionError(f"[DQ] Nulls in {name}: {null_counts.to_dict()}")
-
-def assert_positive(df, cols, name):
-    for c in cols:
-        if (df[c] < 0).any():
-            bad = df[df[c] < 0].head(5).to_dict(orient="records")
-            raise AssertionError(f"[DQ] Negative values in {name}.{c}: sample={bad}")
-
-def main():
-    suppliers = pd.read_csv(BASE / "suppliers.csv")
-    contracts = pd.read_csv(BASE / "contracts.csv", parse_dates=["start_date", "end_date"])
-    orders    = pd.read_csv(BASE / "orders.csv", parse_dates=["order_date"])
-    shipments = pd.read_csv(BASE / "shipments.csv", parse_dates=["shipped_date", "delivered_date"])
-    inventory = pd.read_csv(BASE / "inventory.csv", parse_dates=["date"])
-
-    assert_no_nulls(suppliers, ["supplier_id", "supplier_name"], "suppliers")
-    assert_positive(suppliers, ["lead_time_days", "quality_score"], "suppliers")
-    assert_positive(orders, ["qty_ordered", "unit_price"], "orders")
-    assert_positive(shipments, ["qty_delivered"], "shipments")
-
-    missing_suppliers = set(orders["supplier_id"]) - set(suppliers["supplier_id"])
-    if missing_suppliers:
-        raise AssertionError(f"[DQ] Missing supplier dimension for orders: {missing_suppliers}")
-
-    suppliers.to_parquet(CURATED / "dim_suppliers.parquet", index=False)
-    contracts.to_parquet(CURATED / "stg_contracts.parquet", index=False)
-    orders.to_parquet(CURATED / "stg_orders.parquet", index=False)
-    shipments.to_parquet(CURATED / "stg_shipments.parquet", index=False)
-    inventory.to_parquet(CURATED / "stg_inventory.parquet", index=False)
-
-    print("[ETL] Curated tables written to", CURATED)
+# Raw CSV schemas. Declaring the types up front lets DuckDB parse in parallel without sniffing
+# and stream straight to Parquet, so memory stays flat however large the part files get.
+SCHEMAS = {
+    "suppliers": {"supplier_id": "BIGINT", "supplier_name": "VARCHAR", "country": "VARCHAR",
+                  "lead_time_days": "BIGINT", "quality_score": "DOUBLE"},
+    "contracts": {"contract_id": "BIGINT", "supplier_id": "BIGINT", "start_date": "DATE",
+                  "end_date": "DATE", "committed_value": "BIGINT", "currency": "VARCHAR"},
+    "orders": {"order_id": "BIGINT", "supplier_id": "BIGINT", "order_date": "DATE",
+               "qty_ordered": "BIGINT", "unit_price": "DOUBLE", "contract_id": "BIGINT"},
+    "shipments": {"shipment_id": "VARCHAR", "order_id": "BIGINT", "supplier_id": "BIGINT",
+                  "shipped_date": "DATE", "delivered_date": "DATE",
+                  "qty_delivered": "BIGINT", "defect_units": "BIGINT"},
+    "inventory": {"date": "DATE", "sku": "VARCHAR", "on_hand": "BIGINT", "backorder": "BIGINT"},
+}
+
+def sql_str(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def raw_files(source):
+    if source.endswith(".csv"):
+        return [BASE / source]
+    parts = sorted((BASE / source).glob("part-*.csv"))
+    if not parts:
+        raise FileNotFoundError(f"[ETL] No part files found for {source} under {BASE / source}")
+    return parts
+
+def read_raw(source):
+    files = ", ".join(sql_str(p.as_posix()) for p in raw_files(source))
+    schema = source.split(".")[0]
+    columns = ", ".join(f"{sql_str(c)}: {sql_str(t)}" for c, t in SCHEMAS[schema].items())
+    return f"read_csv([{files}], header = true, auto_detect = false, columns = {{{columns}}})"
+
+# curated table -> raw source under data/. Validation runs afterwards over all tables (etl/dq.py).
+CURATED_TABLES = {
+    "dim_suppliers": "suppliers.csv",
+    "stg_contracts": "contracts.csv",
+    "stg_orders": "orders",
+    "stg_shipments": "shipments",
+    "stg_inventory": "inventory",
+}
+
+# Facts are Hive-partitioned by the month of this date (year_month=YYYY-MM) so month filters skip
+# whole files; every table is sorted so row-group min/max statistics prune supplier and date filters.
+PARTITION_DATES = {"stg_orders": "order_date", "stg_shipments": "delivered_date", "stg_inventory": "date"}
+SORT_KEYS = {
+    "dim_suppliers": ["supplier_id"],
+    "stg_contracts": ["supplier_id", "contract_id"],
+    "stg_orders": ["supplier_id", "order_date", "order_id"],
+    "stg_shipments": ["supplier_id", "delivered_date", "order_id", "shipment_id"],
+    "stg_inventory": ["sku", "date"],
+}
+# Low-cardinality columns that get dictionary encoding; the rest are stored plain.
+DICTIONARY_COLUMNS = {
+    "dim_suppliers": ["country"],
+    "stg_contracts": ["supplier_id", "start_date", "end_date", "currency"],
+    "stg_orders": ["supplier_id", "order_date", "contract_id"],
+    "stg_shipments": ["supplier_id", "shipped_date", "delivered_date"],
+    "stg_inventory": ["date", "sku"],
+}
+ROW_GROUP_ROWS = 16_384
+BATCH_ROWS = 1_000_000
+# DuckDB spills sorts beyond this to disk; pass --memory-limit to trade memory for speed.
+MEMORY_LIMIT = "512MB"
+
+def curated_path(table):
+    return CURATED / table
+
+def curated_scan(table):
+    # DuckDB table function over a curated table, including its year_month partition column.
+    hive = ", hive_partitioning = true, hive_types = {'year_month': VARCHAR}" if table in PARTITION_DATES else ""
+    return f"read_parquet({sql_str((curated_path(table) / '**' / '*.parquet').as_posix())}{hive})"
+
+def replace_dir(tmp, out):
+    old = out.with_name(out.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if out.exists():
+        out.rename(old)
+    tmp.rename(out)
+    shutil.rmtree(old, ignore_errors=True)
+
+def sorted_batches(con, source, order):
+    return con.execute(f"SELECT * FROM {source} ORDER BY {', '.join(order)}").fetch_record_batch(BATCH_ROWS)
+
+def write_parquet(reader, out, table, row_group_rows):
+    options = ds.ParquetFileFormat().make_write_options(
+        compression="zstd", use_dictionary=DICTIONARY_COLUMNS[table], write_statistics=True)
+    ds.write_dataset(
+        reader, out, format="parquet", file_options=options,
+        basename_template="part-{i}.parquet", preserve_order=True,
+        min_rows_per_group=row_group_rows, max_rows_per_group=row_group_rows,
+    )
+
+def curate(table, threads=None, memory_limit=None, row_group_rows=ROW_GROUP_ROWS):
+    out = curated_path(table)
+    tmp = out.with_name(out.name + ".tmp")
+    staging = out.with_name(out.name + ".staging")
+    spill = out.with_name(out.name + ".spill")
+    for d in (tmp, staging, spill):
+        shutil.rmtree(d, ignore_errors=True)
+    con = duckdb.connect()
+    con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+    con.execute(f"SET memory_limit = {sql_str(memory_limit or MEMORY_LIMIT)}")
+    con.execute(f"SET temp_directory = {sql_str(spill.as_posix())}")
+    con.execute("SET enable_progress_bar = false")
+    date_col = PARTITION_DATES.get(table)
+    source = read_raw(CURATED_TABLES[table])
+    try:
+        # DuckDB parses and sorts; pyarrow writes the sorted batches in order, which DuckDB's own
+        # partitioned COPY does not guarantee.
+        if date_col:
+            # One cheap unsorted pass split by month, then sort one month at a time, so memory is
+            # bounded by the largest month and each sort reads only its own month. Rows without a
+            # date land in year_month=NULL and are reported by the not-null DQ rules.
+            con.execute(f"""
+                COPY (SELECT *, strftime({date_col}, '%Y-%m') AS year_month FROM {source})
+                TO {sql_str(staging.as_posix())} (FORMAT parquet, COMPRESSION uncompressed, PARTITION_BY (year_month))
+            """)
+            for month in sorted(staging.glob("year_month=*")):
+                files = sql_str((month / "*.parquet").as_posix())
+                write_parquet(sorted_batches(con, f"read_parquet({files}, hive_partitioning = false)", SORT_KEYS[table]),
+                              tmp / month.name, table, row_group_rows)
+        else:
+            write_parquet(sorted_batches(con, source, SORT_KEYS[table]), tmp, table, row_group_rows)
+        # Readers never see a half-written table.
+        replace_dir(tmp, out)
+    finally:
+        con.close()
+        for d in (tmp, staging, spill):
+            shutil.rmtree(d, ignore_errors=True)
+    # Single-file layout written before partitioning was introduced.
+    out.with_suffix(".parquet").unlink(missing_ok=True)
+    print(f"[ETL] {table} written to", out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate raw data and write curated Parquet tables.")
+    parser.add_argument("--table", action="append", choices=sorted(CURATED_TABLES),
+                        help="curate only this table (repeatable; default: all)")
+    parser.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all cores)")
+    parser.add_argument("--memory-limit", default=None, help=f"DuckDB memory limit, e.g. '1GB' (default: {MEMORY_LIMIT})")
+    parser.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS,
+                        help="rows per Parquet row group (smaller prunes finer, larger scans faster)")
+    parser.add_argument("--skip-dq", action="store_true", help="do not run the data-quality rules")
+    args = parser.parse_args(argv)
+    for table in args.table or CURATED_TABLES:
+        curate(table, args.threads, args.memory_limit, args.row_group_rows)
+    if not args.skip_dq:
+        import dq  # dq imports the layout helpers above
+        dq.main([])
 
 if __name__ == "__main__":
     main()
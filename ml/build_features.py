@@ -0,0 +1,153 @@
+import argparse, json, shutil, sys
+import duckdb
+import pyarrow.dataset as ds
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import warehouse
+DATA = ROOT / "data"
+FEATURE_STORE = DATA / "feature_store" / "supplier_daily_features"
+WATERMARK = FEATURE_STORE / "_watermark.json"
+
+# Rows before a change whose trailing (roll_*_7) or forward (target_late) windows reach it.
+TRAIL_ROWS = 6
+FORWARD_ROWS = 7
+
+BATCH_ROWS = 1_000_000
+MAX_OPEN_FILES = 256
+
+def fact_watermark(con):
+    delivered, ordered = con.execute("""
+        SELECT (SELECT MAX(delivered_date) FROM analytics.fact_shipment),
+               (SELECT MAX(order_date) FROM analytics.fact_order)
+    """).fetchone()
+    return {"delivered_date": str(delivered), "order_date": str(ordered),
+            "history_rows": history_rows(con, delivered, ordered)}
+
+def history_rows(con, delivered, ordered):
+    # Fact rows at or before the watermark; if this changes, history was rewritten rather than appended to.
+    return con.execute("""
+        SELECT (SELECT COUNT(*) FROM analytics.fact_shipment WHERE delivered_date <= ?::DATE)
+             + (SELECT COUNT(*) FROM analytics.fact_order WHERE order_date <= ?::DATE)
+    """, [delivered, ordered]).fetchone()[0]
+
+def load_watermark():
+    if not WATERMARK.exists():
+        return None
+    return json.loads(WATERMARK.read_text())
+
+def write_partitions(con, since, where):
+    # Sorted by partition key, so each supplier/month directory is written exactly once while
+    # only a bounded number of files are open (DuckDB's partitioned COPY buffers every partition).
+    reader = con.execute(f"""
+      SELECT f.*, strftime(f.date, '%Y-%m') AS year_month
+      FROM analytics.supplier_daily_features(DATE '{since}') f
+      WHERE {where}
+      ORDER BY supplier_id, date
+    """).fetch_record_batch(BATCH_ROWS)
+    rows = 0
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+    ds.write_dataset(
+        counted(reader), FEATURE_STORE, schema=reader.schema, format="parquet",
+        partitioning=["supplier_id", "year_month"], partitioning_flavor="hive",
+        basename_template="part-{i}.parquet", existing_data_behavior="overwrite_or_ignore",
+        max_open_files=MAX_OPEN_FILES, max_partitions=BATCH_ROWS,
+    )
+    return rows
+
+def full_build(con):
+    if FEATURE_STORE.exists():
+        shutil.rmtree(FEATURE_STORE)
+    FEATURE_STORE.mkdir(parents=True)
+    return write_partitions(con, "0001-01-01", "true")
+
+def incremental_build(con, watermark):
+    store = f"read_parquet('{FEATURE_STORE.as_posix()}/**/*.parquet', hive_partitioning = true)"
+    con.execute(f"""
+    CREATE OR REPLACE TEMP TABLE changed AS
+    SELECT supplier_id, MIN(d) AS first_changed FROM (
+      SELECT supplier_id, delivered_date AS d FROM analytics.fact_shipment
+      WHERE delivered_date > DATE '{watermark["delivered_date"]}'
+      UNION ALL
+      SELECT supplier_id, order_date AS d FROM analytics.fact_order
+      WHERE order_date > DATE '{watermark["order_date"]}'
+    ) GROUP BY 1
+    """)
+    # Per changed supplier: the first rewritten month starts at the earliest stored row whose
+    # forward label window reaches new data; `since` adds the rows its trailing windows read.
+    con.execute(f"""
+    CREATE OR REPLACE TEMP TABLE rewrite AS
+    WITH known AS (
+      SELECT k.supplier_id, k.date,
+             row_number() OVER (PARTITION BY k.supplier_id ORDER BY k.date DESC) AS rn
+      FROM {store} k JOIN changed c ON k.supplier_id = c.supplier_id AND k.date < c.first_changed
+    ),
+    starts AS (
+      SELECT c.supplier_id,
+             date_trunc('month', LEAST(c.first_changed, MIN(k.date)))::DATE AS part_start
+      FROM changed c LEFT JOIN known k ON k.supplier_id = c.supplier_id AND k.rn <= {FORWARD_ROWS}
+      GROUP BY c.supplier_id, c.first_changed
+    ),
+    lookback AS (
+      SELECT k.supplier_id, k.date,
+             row_number() OVER (PARTITION BY k.supplier_id ORDER BY k.date DESC) AS rn
+      FROM {store} k JOIN starts s ON k.supplier_id = s.supplier_id AND k.date < s.part_start
+    )
+    SELECT s.supplier_id, s.part_start, LEAST(s.part_start, MIN(l.date)) AS since
+    FROM starts s LEFT JOIN lookback l ON l.supplier_id = s.supplier_id AND l.rn <= {TRAIL_ROWS}
+    GROUP BY s.supplier_id, s.part_start
+    """)
+    rewrite = con.execute("SELECT supplier_id, part_start, since FROM rewrite ORDER BY 1").fetchall()
+    if not rewrite:
+        return 0
+
+    for sid, part_start, _ in rewrite:
+        start_ym = part_start.strftime("%Y-%m")
+        for part in (FEATURE_STORE / f"supplier_id={sid}").glob("year_month=*"):
+            if part.name.split("=", 1)[1] >= start_ym:
+                shutil.rmtree(part)
+    since = min(r[2] for r in rewrite)
+    where = "EXISTS (SELECT 1 FROM rewrite r WHERE r.supplier_id = f.supplier_id AND f.date >= r.part_start)"
+    return write_partitions(con, since, where)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the supplier daily feature store.")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="rebuild every partition instead of only those touched since the watermark")
+    parser.add_argument("--db", type=Path, default=None, help="warehouse file to update in place (default: build a new snapshot from the current one and publish it)")
+    args = parser.parse_args(argv)
+
+    # Never write into the published snapshot: dashboards may have it open.
+    snapshot = None if args.db else warehouse.Snapshot()
+    con = duckdb.connect(str(args.db or snapshot.db()))
+    con.execute("CREATE SCHEMA IF NOT EXISTS analytics;")
+    con.execute((ROOT / "models" / "sql" / "features.sql").read_text())
+
+    previous = load_watermark()
+    current = fact_watermark(con)
+    rebuild = (args.full_refresh or previous is None or not FEATURE_STORE.exists()
+               or current["delivered_date"] < previous["delivered_date"]
+               or current["order_date"] < previous["order_date"]
+               or history_rows(con, previous["delivered_date"], previous["order_date"])
+                  != previous.get("history_rows"))
+    if rebuild:
+        rows = full_build(con)
+        print(f"[FS] Full build: {rows} supplier-days written to {FEATURE_STORE}")
+    elif current == previous:
+        print(f"[FS] Feature store up to date (watermark {current})")
+    else:
+        rows = incremental_build(con, previous)
+        print(f"[FS] Incremental build: {rows} supplier-days rewritten since watermark {previous}")
+    con.close()
+    if snapshot:
+        snapshot.publish()
+
+    WATERMARK.write_text(json.dumps(current, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse, hashlib, json, pickle, sys, time
+from datetime import date, datetime
+import duckdb, numpy as np
+import pyarrow as pa
+from pathlib import Path
+from train_late_model import DATA, FEATURES, MODEL_PATH, ROOT, X_cols
+sys.path.insert(0, str(ROOT))
+import warehouse
+
+BATCH_ROWS = 500_000
+KEEP_VERSIONS = 3
+REPORT_PATH = DATA / "models" / "last_scoring_run.json"
+
+def model_version(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+def score_batches(model, since, batch_size):
+    # DuckDB regroups the store's one-file-per-supplier-and-month layout into batch_size-row batches;
+    # a pyarrow dataset scan yields roughly one small batch per file.
+    files = (FEATURES / "**" / "*.parquet").as_posix()
+    where, params = ("WHERE date >= ?", [since]) if since else ("", [])
+    con = duckdb.connect()
+    try:
+        reader = con.execute(f"""
+            SELECT supplier_id::INTEGER AS supplier_id, date, {', '.join(X_cols)}
+            FROM read_parquet('{files}', hive_partitioning = true) {where}
+        """, params).fetch_record_batch(batch_size)
+        for batch in reader:
+            if not batch.num_rows:
+                continue
+            X = np.column_stack([np.asarray(batch[c]) for c in X_cols]).astype(float)
+            yield batch, model.predict_proba(X)[:, 1]
+    finally:
+        con.close()
+
+def prune_versions(con, keep):
+    # Every snapshot carries this table over, so keep only the most recently scored model versions.
+    before = con.execute("SELECT COUNT(*) FROM analytics.fact_supplier_risk").fetchone()[0]
+    con.execute("""
+    DELETE FROM analytics.fact_supplier_risk WHERE model_version NOT IN (
+      SELECT model_version FROM analytics.fact_supplier_risk
+      GROUP BY model_version ORDER BY MAX(scored_at) DESC NULLS LAST, model_version LIMIT ?
+    )""", [keep])
+    return before - con.execute("SELECT COUNT(*) FROM analytics.fact_supplier_risk").fetchone()[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score supplier-days with the late-shipment model.")
+    parser.add_argument("--since", type=date.fromisoformat,
+                        help="only score supplier-days on or after this date (default: all)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_ROWS)
+    parser.add_argument("--keep-versions", type=int, default=KEEP_VERSIONS,
+                        help="model versions kept in fact_supplier_risk, most recently scored first (0 keeps all)")
+    parser.add_argument("--db", type=Path, default=None, help="warehouse file to update in place (default: build a new snapshot from the current one and publish it)")
+    args = parser.parse_args(argv)
+
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    version = model_version(MODEL_PATH)
+
+    # Never write into the published snapshot: dashboards may have it open.
+    snapshot = None if args.db else warehouse.Snapshot()
+    con = duckdb.connect(str(args.db or snapshot.db()))
+    con.execute("CREATE SCHEMA IF NOT EXISTS analytics;")
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS analytics.fact_supplier_risk (
+      supplier_id INTEGER, date DATE, score DOUBLE, model_version VARCHAR, scored_at TIMESTAMP
+    )""")
+    # Snapshots from before scored_at existed.
+    con.execute("ALTER TABLE analytics.fact_supplier_risk ADD COLUMN IF NOT EXISTS scored_at TIMESTAMP")
+
+    start = time.perf_counter()
+    rows = 0
+    scoring_s = 0.0
+    scored_at = datetime.now()
+    con.execute("BEGIN TRANSACTION")
+    con.execute("DELETE FROM analytics.fact_supplier_risk WHERE model_version = ? AND date >= ?",
+                [version, args.since or date.min])
+    t = time.perf_counter()
+    for batch, score in score_batches(model, args.since, args.batch_size):
+        scoring_s += time.perf_counter() - t
+        scored = pa.table({
+            "supplier_id": batch["supplier_id"],
+            "date": batch["date"],
+            "score": score,
+        })
+        con.register("scored", scored)
+        con.execute("""
+        INSERT INTO analytics.fact_supplier_risk (supplier_id, date, score, model_version, scored_at)
+        SELECT *, ?, ? FROM scored""", [version, scored_at])
+        con.unregister("scored")
+        rows += batch.num_rows
+        t = time.perf_counter()
+    pruned = prune_versions(con, args.keep_versions) if args.keep_versions > 0 else 0
+    con.execute("COMMIT")
+    con.close()
+    elapsed = time.perf_counter() - start
+    if snapshot:
+        snapshot.publish()
+
+    report = {
+        "model_version": version,
+        "since": str(args.since) if args.since else None,
+        "rows": rows,
+        "pruned_rows": pruned,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed) if elapsed else None,
+        "scoring_rows_per_s": round(rows / scoring_s) if scoring_s else None,
+    }
+    REPORT_PATH.write_text(json.dumps(report, indent=2))
+    print(f"[SCORE] {rows} supplier-days scored with model {version} in {elapsed:.2f}s "
+          f"({report['rows_per_s']} rows/s end-to-end, {report['scoring_rows_per_s']} rows/s scoring)")
+
+if __name__ == "__main__":
+    main()
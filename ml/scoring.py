@@ -0,0 +1,63 @@
+import numpy as np
+import pyarrow.parquet as pq
+from functools import lru_cache
+from pathlib import Path
+
+# Deliberately free of scikit-learn: scoring only needs the compact artifact written by
+# train_late_model.py and the supplier partitions of the feature store.
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data"
+FEATURES = DATA / "feature_store" / "supplier_daily_features"
+COMPACT_PATH = DATA / "models" / "late_shipment_model.npz"
+
+SUPPLIER_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=1)
+def load_model(path=COMPACT_PATH):
+    with np.load(path) as z:
+        return z["coef"], float(z["intercept"]), [str(c) for c in z["X_cols"]]
+
+def score_features(X):
+    coef, intercept, _ = load_model()
+    return 1.0 / (1.0 + np.exp(-(np.asarray(X, dtype=float) @ coef + intercept)))
+
+@lru_cache(maxsize=SUPPLIER_CACHE_SIZE)
+def supplier_scores(supplier_id):
+    # Sorted day numbers and precomputed scores for one supplier; later lookups are a bisect.
+    part = FEATURES / f"supplier_id={int(supplier_id)}"
+    _, _, X_cols = load_model()
+    if not part.exists():
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    table = pq.read_table(part, columns=["date"] + X_cols, partitioning=None)
+    day = np.asarray(table["date"]).astype("datetime64[D]").astype(np.int64)
+    order = np.argsort(day, kind="stable")
+    X = np.column_stack([np.asarray(table[c]) for c in X_cols])
+    return day[order], score_features(X[order])
+
+def to_day(date):
+    return np.datetime64(date, "D").astype(np.int64)
+
+def score(supplier_id, date=None):
+    # Risk from the supplier's latest features on or before `date` (default: latest overall).
+    day, scores = supplier_scores(supplier_id)
+    i = len(day) if date is None else np.searchsorted(day, to_day(date), side="right")
+    return float(scores[i - 1]) if i else float("nan")
+
+def score_batch(supplier_ids, dates=None):
+    supplier_ids = np.asarray(supplier_ids)
+    out = np.full(len(supplier_ids), np.nan)
+    days = None if dates is None else np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    for sid in np.unique(supplier_ids):
+        idx = np.flatnonzero(supplier_ids == sid)
+        day, scores = supplier_scores(int(sid))
+        if not len(day):
+            continue
+        pos = np.full(len(idx), len(day)) if days is None else np.searchsorted(day, days[idx], side="right")
+        ok = pos > 0
+        out[idx[ok]] = scores[pos[ok] - 1]
+    return out
+
+def reload():
+    # Call after the model is retrained or the feature store is rebuilt.
+    load_model.cache_clear()
+    supplier_scores.cache_clear()
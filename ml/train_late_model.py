@@ -1,104 +1,202 @@
-import duckdb, pandas as pd, numpy as np
+import argparse, shutil
+import duckdb
+import numpy as np
+import pyarrow.parquet as pq
 from pathlib import Path
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import roc_auc_score, classification_report
-import pickle
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+import json, pickle, sys
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from rss import peak_rss_mb
 DATA = ROOT / "data"
 FEATURE_DIR = DATA / "feature_store"
 MODEL_DIR = DATA / "models"
-FEATURE_DIR.mkdir(parents=True, exist_ok=True)
-MODEL_DIR.mkdir(parents=True, exist_ok=True)
-
-con = duckdb.connect(str(DATA / "opspulse.duckdb"))
-con.execute("CREATE SCHEMA IF NOT EXISTS analytics;")
-con.execute("SET schema='analytics';")
-
-features = con.execute("""
-WITH delivered AS (
-  SELECT supplier_id,
-         CAST(delivered_date AS DATE) as d,
-         SUM(qty_delivered) as qty_delivered,
-         SUM(defect_units) as defect_units,
-         AVG(
-           CASE 
-             WHEN CAST(delivered_date AS DATE) 
-                  <= CAST(shipped_date AS DATE) + CAST(lead_time_days AS INTEGER)
-             THEN 1.0 ELSE 0.0 
-           END
-         ) AS on_time
-  FROM analytics.fact_shipment
-  JOIN analytics.dim_supplier USING (supplier_id)
-  GROUP BY 1,2
-),
-ordered AS (
-  SELECT supplier_id,
-         CAST(order_date AS DATE) as d,
-         SUM(qty_ordered) as qty_ordered,
-         SUM(order_value) as order_value
-  FROM analytics.fact_order
-  GROUP BY 1,2
-),
-agg AS (
-  SELECT coalesce(o.supplier_id, d.supplier_id) as supplier_id,
-         coalesce(o.d, d.d) as date,
-         coalesce(qty_ordered, 0) as qty_ordered,
-         coalesce(order_value, 0) as order_value,
-         coalesce(qty_delivered, 0) as qty_delivered,
-         coalesce(defect_units, 0) as defect_units,
-         coalesce(on_time, 0) as on_time
-  FROM ordered o
-  FULL OUTER JOIN delivered d
-  ON o.supplier_id = d.supplier_id AND o.d = d.d
-)
-SELECT * FROM agg ORDER BY supplier_id, date
-""").df()
-
-features["date"] = pd.to_datetime(features["date"])
-features["target_late"] = 0
-
-for sid in features["supplier_id"].unique():
-    s = features[features["supplier_id"] == sid].sort_values("date").copy()
-    for idx in range(len(s)):
-        window = s.iloc[idx+1:idx+8]["on_time"]
-        if len(window) >= 3 and window.mean() < 0.8:
-            features.loc[s.index[idx], "target_late"] = 1
-
-features["defect_rate"] = features["defect_units"] / (features["qty_delivered"].replace(0, np.nan))
-features["defect_rate"] = features["defect_rate"].fillna(0.0)
-features["fill_rate"] = features["qty_delivered"] / (features["qty_ordered"].replace(0, np.nan))
-features["fill_rate"] = features["fill_rate"].fillna(0.0)
-
-features = features.sort_values(["supplier_id","date"])
-features["roll_on_time_7"] = features.groupby("supplier_id")["on_time"].transform(lambda x: x.rolling(7, min_periods=1).mean())
-features["roll_defect_7"] = features.groupby("supplier_id")["defect_rate"].transform(lambda x: x.rolling(7, min_periods=1).mean())
-features["roll_fill_7"] = features.groupby("supplier_id")["fill_rate"].transform(lambda x: x.rolling(7, min_periods=1).mean())
-
-FEATURE_DIR.mkdir(exist_ok=True)
-features.to_parquet(FEATURE_DIR / "supplier_daily_features.parquet", index=False)
-
-cut = features["date"].quantile(0.8)
-train = features[features["date"] <= cut]
-test  = features[features["date"] >  cut]
+FEATURES = FEATURE_DIR / "supplier_daily_features"
+MODEL_PATH = MODEL_DIR / "late_shipment_model.pkl"
+COMPACT_PATH = MODEL_DIR / "late_shipment_model.npz"
+STAGING = MODEL_DIR / ".train_staging"
 
 X_cols = ["roll_on_time_7", "roll_defect_7", "roll_fill_7", "qty_ordered", "qty_delivered", "order_value"]
-X_train, y_train = train[X_cols], train["target_late"]
-X_test,  y_test  = test[X_cols],  test["target_late"]
-
-if y_train.nunique() < 2:
-    y_train = (train["roll_on_time_7"] < train["roll_on_time_7"].median()).astype(int)
-if y_test.nunique() < 2:
-    y_test = (test["roll_on_time_7"] < test["roll_on_time_7"].median()).astype(int)
-
-clf = LogisticRegression(max_iter=1000)
-clf.fit(X_train, y_train)
-proba = clf.predict_proba(X_test)[:,1]
-auc = roc_auc_score(y_test, proba)
-print(f"[ML] Late-shipment risk AUC: {auc:.3f}")
-print("[ML] Classification report (threshold=0.5):")
-print(classification_report(y_test, (proba >= 0.5).astype(int)))
-
-with open(MODEL_DIR / "late_shipment_model.pkl", "wb") as f:
-    pickle.dump(clf, f)
-print("[ML] Model saved to", MODEL_DIR / "late_shipment_model.pkl")
+TEST_QUANTILE = 0.8
+
+def to_xy(table):
+    # Works for both Tables and RecordBatches; only the model columns are converted.
+    X = np.column_stack([np.asarray(table[c]) for c in X_cols]).astype(float)
+    return X, np.asarray(table["target_late"]), day_index(table)
+
+def day_index(table):
+    return np.asarray(table["date"]).astype("datetime64[D]").astype(np.int64)
+
+# =========================
+# In-memory trainer
+# =========================
+def train_in_memory(args):
+    # Features (including the target label) are built by build_features.py into a Hive-partitioned store.
+    X, y, day = to_xy(pq.read_table(FEATURES, columns=X_cols + ["date", "target_late"]))
+    roll_on_time = X[:, X_cols.index("roll_on_time_7")]
+
+    cut = np.quantile(day, TEST_QUANTILE)
+    is_train = day <= cut
+
+    X_train, y_train = X[is_train], y[is_train]
+    X_test,  y_test  = X[~is_train], y[~is_train]
+
+    if np.unique(y_train).size < 2:
+        y_train = (roll_on_time[is_train] < np.median(roll_on_time[is_train])).astype(int)
+    if np.unique(y_test).size < 2:
+        y_test = (roll_on_time[~is_train] < np.median(roll_on_time[~is_train])).astype(int)
+
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(X_train, y_train)
+    proba = clf.predict_proba(X_test)[:,1]
+    auc = roc_auc_score(y_test, proba)
+    print(f"[ML] Late-shipment risk AUC: {auc:.3f}")
+    print("[ML] Classification report (threshold=0.5):")
+    print(classification_report(y_test, (proba >= 0.5).astype(int)))
+    return clf
+
+# =========================
+# Streaming trainer
+# =========================
+class StreamingAUC:
+    # ROC AUC from per-class score histograms; exact up to the bin width.
+    def __init__(self, bins=1 << 16):
+        self.bins = bins
+        self.pos = np.zeros(bins)
+        self.neg = np.zeros(bins)
+
+    def update(self, y, proba):
+        idx = np.minimum((proba * self.bins).astype(np.int64), self.bins - 1)
+        self.pos += np.bincount(idx[y == 1], minlength=self.bins)
+        self.neg += np.bincount(idx[y == 0], minlength=self.bins)
+
+    def value(self):
+        n_pos, n_neg = self.pos.sum(), self.neg.sum()
+        if n_pos == 0 or n_neg == 0:
+            return float("nan")
+        neg_below = np.cumsum(self.neg) - self.neg
+        return float((self.pos * (neg_below + 0.5 * self.neg)).sum() / (n_pos * n_neg))
+
+def stage_features(columns, path, batch_size):
+    # The store holds one small file per supplier and month, so each pass over it is dominated by
+    # opening files. Copy the columns once into a single local file, interleaving suppliers by a fixed
+    # hash, with one row group per batch; every later pass reads this file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect()
+    try:
+        con.execute("SET memory_limit = '512MB'")
+        con.execute(f"SET temp_directory = '{path.parent.as_posix()}'")
+        files = (FEATURES / "**" / "*.parquet").as_posix()
+        con.execute(f"""
+            COPY (
+              SELECT {', '.join(columns)} FROM read_parquet('{files}', hive_partitioning = true)
+              ORDER BY hash(supplier_id, date)
+            ) TO '{path.as_posix()}' (FORMAT parquet, ROW_GROUP_SIZE {batch_size})
+        """)
+    finally:
+        con.close()
+
+def iter_batches(path, columns, batch_size, rng=None):
+    # With rng, row groups come in a new order each call and rows are shuffled within each batch.
+    staged = pq.ParquetFile(path)
+    groups = list(range(staged.num_row_groups))
+    if rng is not None:
+        rng.shuffle(groups)
+    for batch in staged.iter_batches(batch_size=batch_size, row_groups=groups, columns=columns):
+        if batch.num_rows:
+            yield batch if rng is None else batch.take(rng.permutation(batch.num_rows))
+
+def quantile_from_counts(values, counts, q):
+    # Same linear interpolation as np.quantile over the expanded values.
+    order = np.argsort(values)
+    values, cum = values[order], np.cumsum(counts[order])
+    h = (cum[-1] - 1) * q
+    lo = values[np.searchsorted(cum, np.floor(h), side="right")]
+    hi = values[np.searchsorted(cum, np.ceil(h), side="right")]
+    return lo + (hi - lo) * (h - np.floor(h))
+
+def train_streaming(args):
+    columns = X_cols + ["date", "target_late"]
+    staged = STAGING / "features.parquet"
+    stage_features(columns, staged, args.batch_size)
+    try:
+        return fit_streaming(staged, columns, args)
+    finally:
+        shutil.rmtree(STAGING, ignore_errors=True)
+
+def fit_streaming(staged, columns, args):
+    days = {}
+    for batch in iter_batches(staged, ["date"], args.batch_size):
+        d, n = np.unique(day_index(batch), return_counts=True)
+        for k, v in zip(d.tolist(), n.tolist()):
+            days[k] = days.get(k, 0) + v
+    cut = quantile_from_counts(np.array(list(days)), np.array(list(days.values())), TEST_QUANTILE)
+
+    scaler = StandardScaler()
+    for batch in iter_batches(staged, columns, args.batch_size):
+        X, y, day = to_xy(batch)
+        if (day <= cut).any():
+            scaler.partial_fit(X[day <= cut])
+
+    clf = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+    rng = np.random.default_rng(0)
+    for _ in range(args.epochs):
+        for batch in iter_batches(staged, columns, args.batch_size, rng):
+            X, y, day = to_xy(batch)
+            train = day <= cut
+            if train.any():
+                clf.partial_fit(scaler.transform(X[train]), y[train], classes=[0, 1])
+
+    auc = StreamingAUC()
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    for batch in iter_batches(staged, columns, args.batch_size):
+        X, y, day = to_xy(batch)
+        test = day > cut
+        if test.any():
+            proba = clf.predict_proba(scaler.transform(X[test]))[:, 1]
+            auc.update(y[test], proba)
+            np.add.at(confusion, (y[test], (proba >= 0.5).astype(int)), 1)
+    print(f"[ML] Late-shipment risk AUC (streaming): {auc.value():.3f}")
+    print(f"[ML] Confusion matrix (threshold=0.5, rows=actual):\n{confusion}")
+    return Pipeline([("scaler", scaler), ("clf", clf)])
+
+TRAINERS = {"memory": train_in_memory, "streaming": train_streaming}
+
+def linear_weights(model):
+    # Fold the streaming trainer's scaler into the weights so both trainers export raw-feature coefficients.
+    if isinstance(model, Pipeline):
+        scaler, clf = model.named_steps["scaler"], model.named_steps["clf"]
+        coef = clf.coef_[0] / scaler.scale_
+        return coef, float(clf.intercept_[0] - (coef * scaler.mean_).sum())
+    return model.coef_[0], float(model.intercept_[0])
+
+def export_compact(model):
+    # Dependency-free artifact for ml/scoring.py: score = sigmoid(X[X_cols] @ coef + intercept).
+    coef, intercept = linear_weights(model)
+    np.savez(COMPACT_PATH, coef=coef, intercept=intercept, X_cols=np.array(X_cols))
+    COMPACT_PATH.with_suffix(".json").write_text(json.dumps(
+        {"X_cols": X_cols, "coef": coef.tolist(), "intercept": intercept}, indent=2))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the late-shipment risk model.")
+    parser.add_argument("--trainer", choices=sorted(TRAINERS), default="memory",
+                        help="'memory' fits LogisticRegression on the full table; 'streaming' "
+                             "fits an SGD model batch by batch in bounded memory")
+    parser.add_argument("--batch-size", type=int, default=250_000, help="rows per record batch (streaming)")
+    parser.add_argument("--epochs", type=int, default=5, help="passes over the training rows (streaming)")
+    args = parser.parse_args(argv)
+
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    model = TRAINERS[args.trainer](args)
+    with open(MODEL_PATH, "wb") as f:
+        pickle.dump(model, f)
+    export_compact(model)
+    print("[ML] Model saved to", MODEL_PATH, "and", COMPACT_PATH)
+    print(f"[ML] trainer={args.trainer} peak RSS {peak_rss_mb():.0f} MB")
+
+if __name__ == "__main__":
+    main()
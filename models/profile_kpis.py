@@ -0,0 +1,143 @@
+import argparse, json, sys, time
+import duckdb
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import warehouse
+
+PROFILE_DIR = ROOT / "data" / "profile"
+BASELINE_PATH = PROFILE_DIR / "baseline.json"
+
+# Full-history KPI views and the feature query, as the dashboard and training read them.
+QUERIES = {
+    "kpi_supplier_ontime": "SELECT * FROM analytics.v_kpi_supplier_ontime",
+    "kpi_supplier_fillrate": "SELECT * FROM analytics.v_kpi_supplier_fillrate",
+    "kpi_contract_utilization": "SELECT * FROM analytics.v_kpi_contract_utilization",
+    "kpi_spend_leakage": "SELECT * FROM analytics.v_kpi_spend_leakage",
+    "supplier_daily_features": "SELECT * FROM analytics.v_supplier_daily_features",
+}
+
+def operators(node, out=None, seen=None):
+    # Pre-order list of plan operators. Keys are the operator and its table, numbered on repeats,
+    # so a rewrite that drops a join shows up as removed operators rather than shifting the rest.
+    out = [] if out is None else out
+    seen = {} if seen is None else seen
+    info = node.get("extra_info") or {}
+    label = node["operator_type"] + (f" {info['Text']}" if info.get("Text") else "")
+    seen[label] = seen.get(label, 0) + 1
+    out.append({"op": label if seen[label] == 1 else f"{label} #{seen[label]}",
+                "timing_s": node.get("operator_timing", 0.0), "cardinality": node.get("operator_cardinality", 0),
+                "rows_scanned": node.get("operator_rows_scanned", 0)})
+    for child in node.get("children", []):
+        operators(child, out, seen)
+    return out
+
+def profile(con, sql, repeat, scratch):
+    # Best of `repeat` runs under DuckDB's JSON profiler.
+    best = None
+    con.execute("SET enable_profiling = 'json'")
+    con.execute(f"SET profiling_output = '{scratch.as_posix()}'")
+    try:
+        for _ in range(repeat):
+            con.execute(sql).fetchall()
+            run = json.loads(scratch.read_text())
+            if best is None or run["latency"] < best["latency"]:
+                best = run
+    finally:
+        con.execute("PRAGMA disable_profiling")
+        scratch.unlink(missing_ok=True)
+    ops = [op for child in best.get("children", []) for op in operators(child)]
+    return {"latency_s": best["latency"], "cpu_s": best.get("cpu_time", 0.0),
+            "rows_returned": best.get("rows_returned", 0),
+            "rows_scanned": best.get("cumulative_rows_scanned", 0), "operators": ops}
+
+def result_fingerprint(con, sql):
+    # Doubles are rounded so parallel summation order cannot change the fingerprint.
+    cols = con.execute(f"DESCRIBE {sql}").fetchall()
+    select = ", ".join(f"round(\"{c}\", 9) AS \"{c}\"" if t in ("DOUBLE", "FLOAT") else f"\"{c}\""
+                       for c, t, *_ in cols)
+    rows, h = con.execute(f"SELECT COUNT(*), bit_xor(hash(q)) FROM (SELECT {select} FROM ({sql})) q").fetchone()
+    return f"{rows}:{h}"
+
+def data_fingerprint(con):
+    # The KPI refresh already fingerprints the facts and dimensions; same value, same input data.
+    return "{}:{}".format(*con.execute(
+        "SELECT SUM(row_count), bit_xor(fingerprint) FROM analytics.kpi_refresh_state").fetchone())
+
+def diff_operators(old, new):
+    old_ops, new_ops = {o["op"]: o for o in old}, {o["op"]: o for o in new}
+    rows = []
+    for name in list(old_ops) + [n for n in new_ops if n not in old_ops]:
+        a, b = old_ops.get(name), new_ops.get(name)
+        rows.append({"op": name, "status": "removed" if b is None else "added" if a is None else "kept",
+                     "timing_s": [a and a["timing_s"], b and b["timing_s"]],
+                     "cardinality": [a and a["cardinality"], b and b["cardinality"]]})
+    return rows
+
+def compare(report, baseline):
+    same_data = report["data"] == baseline["data"]
+    changed = []
+    for name, new in report["queries"].items():
+        old = baseline["queries"].get(name)
+        if old is None:
+            print(f"[PROFILE] {name}: not in baseline")
+            continue
+        new["diff"] = diff_operators(old["operators"], new["operators"])
+        delta = new["latency_s"] / old["latency_s"] - 1 if old["latency_s"] else 0.0
+        if not same_data:
+            result = "data differs, results not compared"
+        elif new["result"] == old["result"]:
+            result = "same result"
+        else:
+            result = "RESULT CHANGED"
+            changed.append(name)
+        print(f"[PROFILE] {name:26s} {old['latency_s'] * 1000:8.1f}ms -> {new['latency_s'] * 1000:8.1f}ms "
+              f"({delta:+.0%})  rows scanned {old['rows_scanned']:,} -> {new['rows_scanned']:,}  {result}")
+        for d in new["diff"]:
+            if d["status"] != "kept" or d["cardinality"][0] != d["cardinality"][1]:
+                print(f"[PROFILE]     {d['status']:8s} {d['op']}  rows {d['cardinality'][0]} -> {d['cardinality'][1]}")
+    return changed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the KPI views and feature query with DuckDB's profiler.")
+    parser.add_argument("--db", type=Path, default=None, help="warehouse file (default: current snapshot)")
+    parser.add_argument("--scale", type=float, default=None,
+                        help="run the pipeline at this scale first (default: profile the current warehouse)")
+    parser.add_argument("--query", action="append", choices=sorted(QUERIES), help="profile only this query (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query (fastest is kept)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    if args.scale is not None:
+        import run_pipeline
+        run_pipeline.main(["--scale", str(args.scale)])
+    db = args.db or warehouse.current_db()
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(str(db), read_only=True)
+    report = {"run_id": time.strftime("%Y%m%dT%H%M%S"), "db": db.name, "duckdb": duckdb.__version__,
+              "data": data_fingerprint(con), "queries": {}}
+    for name in args.query or QUERIES:
+        sql = QUERIES[name]
+        stats = profile(con, sql, args.repeat, PROFILE_DIR / f".{name}.json")
+        stats["result"] = result_fingerprint(con, sql)
+        report["queries"][name] = stats
+        print(f"[PROFILE] {name:26s} {stats['latency_s'] * 1000:8.1f}ms  rows scanned {stats['rows_scanned']:,}  "
+              f"returned {stats['rows_returned']:,}")
+    con.close()
+
+    changed = []
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print("[PROFILE] Baseline saved to", args.baseline)
+    elif args.baseline.exists():
+        changed = compare(report, json.loads(args.baseline.read_text()))
+    out = PROFILE_DIR / f"{report['run_id']}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print("[PROFILE] Report written to", out)
+    if changed:
+        raise AssertionError(f"[PROFILE] Results differ from the baseline on the same data: {', '.join(changed)}")
+
+if __name__ == "__main__":
+    main()
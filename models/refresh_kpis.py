@@ -0,0 +1,139 @@
+import argparse, hashlib, sys, time
+import duckdb
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import warehouse
+
+# materialized table -> KPI macro; every table has a year_month column.
+KPI_TABLES = {
+    "kpi_supplier_ontime_monthly": "kpi_supplier_ontime",
+    "kpi_supplier_fillrate_monthly": "kpi_supplier_fillrate",
+    "kpi_contract_spend_monthly": "kpi_contract_spend",
+    "kpi_spend_leakage_monthly": "kpi_spend_leakage",
+    # Refreshed in this order; each inventory rollup reads the table above it.
+    "kpi_inventory_daily": "kpi_inventory_by_day",
+    "kpi_inventory_weekly": "kpi_inventory_by_week",
+    "kpi_inventory_monthly": "kpi_inventory_by_month",
+}
+# Fingerprinted sources each table reads; a table is only refreshed for changes in its own sources.
+ORDER_SOURCES = {"fact_order", "fact_shipment", "dims"}
+INVENTORY_SOURCES = {"fact_inventory"}
+SOURCES = {table: INVENTORY_SOURCES if table.startswith("kpi_inventory_") else ORDER_SOURCES for table in KPI_TABLES}
+# Usage and stockout streaks carry from one month into the next, so a changed month also refreshes
+# every later month of these tables.
+CASCADE = {"kpi_inventory_daily", "kpi_inventory_weekly", "kpi_inventory_monthly"}
+
+SQL = ROOT / "models" / "sql"
+# The KPI definitions are fingerprinted as a source of their own: editing a macro or table definition
+# makes every materialized month stale, so it forces a full refresh.
+DEFINITIONS = [SQL / "kpis.sql", SQL / "kpi_tables.sql"]
+
+# Month fingerprints per source: a month is refreshed when its row count or row hash changes.
+# Dimension changes can move any month, so they are fingerprinted as a single '*' month.
+FINGERPRINTS = """
+SELECT 'fact_order' AS source, year_month, COUNT(*) AS row_count,
+       bit_xor(hash(order_id, supplier_id, order_date, qty_ordered, unit_price, contract_id,
+                    resolved_contract_id)) AS fingerprint
+FROM analytics.fact_order GROUP BY 1, 2
+UNION ALL
+SELECT 'fact_shipment', year_month, COUNT(*),
+       bit_xor(hash(shipment_key, supplier_id, shipped_date, delivered_date, qty_delivered, defect_units))
+FROM analytics.fact_shipment GROUP BY 1, 2
+UNION ALL
+SELECT 'fact_inventory', year_month, COUNT(*), bit_xor(hash(date, sku::VARCHAR, on_hand, backorder))
+FROM analytics.fact_inventory GROUP BY 1, 2
+UNION ALL
+SELECT 'dims', '*', COUNT(*), bit_xor(h) FROM (
+  SELECT hash(supplier_id, supplier_name, country, lead_time_days, quality_score) AS h FROM analytics.dim_supplier
+  UNION ALL
+  SELECT hash(contract_id, supplier_id, start_date, end_date, committed_value, currency) FROM analytics.dim_contract
+)
+"""
+
+def definitions_fingerprint():
+    h = hashlib.sha256()
+    for path in DEFINITIONS:
+        h.update(path.read_bytes())
+    return int(h.hexdigest()[:16], 16)
+
+def refresh(con, full=False):
+    con.execute((SQL / "kpi_tables.sql").read_text())
+    con.execute(f"CREATE OR REPLACE TEMP TABLE new_state AS {FINGERPRINTS}")
+    con.execute("INSERT INTO new_state VALUES ('definitions', '*', 0, ?::UBIGINT)", [definitions_fingerprint()])
+    con.execute("""
+    CREATE OR REPLACE TEMP TABLE changed AS
+    SELECT COALESCE(n.source, o.source) AS source, COALESCE(n.year_month, o.year_month) AS year_month
+    FROM new_state n FULL OUTER JOIN analytics.kpi_refresh_state o
+      ON n.source = o.source AND n.year_month = o.year_month
+    WHERE n.row_count IS DISTINCT FROM o.row_count OR n.fingerprint IS DISTINCT FROM o.fingerprint
+    """)
+    changed = {}
+    for source, year_month in con.execute("SELECT source, year_month FROM changed ORDER BY 2").fetchall():
+        changed.setdefault(source, []).append(year_month)
+    redefined = "definitions" in changed
+
+    con.execute("BEGIN TRANSACTION")
+    if redefined:
+        # A macro's columns may have changed too; recreate the tables from the current definitions.
+        for table in KPI_TABLES:
+            con.execute(f"DROP TABLE IF EXISTS analytics.{table}")
+        con.execute((SQL / "kpi_tables.sql").read_text())
+    scopes = {}
+    for table, macro in KPI_TABLES.items():
+        sources = SOURCES[table]
+        # '*' is a dimension change, which can move any month of the tables that read dimensions.
+        if full or redefined or "*" in {m for s in sources for m in changed.get(s, [])}:
+            scopes[table] = None
+            con.execute(f"DELETE FROM analytics.{table}")
+            con.execute(f"""INSERT INTO analytics.{table}
+                SELECT * FROM analytics.{macro}(DATE '0001-01-01', DATE '9999-12-31')""")
+            continue
+        months = sorted({m for s in sources for m in changed.get(s, []) if m is not None})
+        scopes[table] = months
+        if not months:
+            continue
+        # Scan only the date span of the affected months, then keep exactly those months.
+        lo = f"DATE '{months[0]}-01'"
+        hi = f"DATE '{months[-1]}-01' + INTERVAL 1 MONTH"
+        if table in CASCADE:
+            con.execute(f"DELETE FROM analytics.{table} WHERE year_month >= '{months[0]}'")
+            con.execute(f"""INSERT INTO analytics.{table}
+                SELECT * FROM analytics.{macro}({lo}, DATE '9999-12-31')""")
+            continue
+        in_months = ", ".join(f"'{m}'" for m in months)
+        con.execute(f"DELETE FROM analytics.{table} WHERE year_month IN ({in_months})")
+        con.execute(f"""INSERT INTO analytics.{table}
+            SELECT * FROM analytics.{macro}({lo}, {hi}) WHERE year_month IN ({in_months})""")
+    con.execute("DELETE FROM analytics.kpi_refresh_state")
+    con.execute("INSERT INTO analytics.kpi_refresh_state SELECT * FROM new_state")
+    con.execute("COMMIT")
+    return scopes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh materialized KPI tables.")
+    parser.add_argument("--full", action="store_true", help="recompute every month")
+    parser.add_argument("--db", type=Path, default=None, help="warehouse file to update in place (default: build a new snapshot from the current one and publish it)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    # Never write into the published snapshot: dashboards may have it open.
+    snapshot = None if args.db else warehouse.Snapshot()
+    con = duckdb.connect(str(args.db or snapshot.db()))
+    scopes = refresh(con, full=args.full)
+    con.close()
+    if snapshot:
+        snapshot.publish()
+    refreshed = {t: m for t, m in scopes.items() if m is None or m}
+    if not refreshed:
+        scope = "no changes"
+    elif len(refreshed) == len(scopes) and all(m is None for m in refreshed.values()):
+        scope = "all months"
+    else:
+        scope = "; ".join(f"{t} all months" if m is None else f"{t} {len(m)} month(s) {m[0]}..{m[-1]}"
+                          for t, m in refreshed.items())
+    print(f"[KPI] Materialized KPIs refreshed: {scope} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
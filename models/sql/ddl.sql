@@ -1,49 +1,108 @@
 CREATE SCHEMA IF NOT EXISTS analytics;
 
+-- Curated facts are partitioned by year_month (see etl/transform_validate.py); filters on
+-- year_month skip whole files and supplier/date filters skip row groups.
+
 CREATE OR REPLACE VIEW analytics.stg_suppliers AS
-  SELECT * FROM read_parquet('data/curated/dim_suppliers.parquet');
+  SELECT * FROM read_parquet('data/curated/dim_suppliers/*.parquet');
 
 CREATE OR REPLACE VIEW analytics.stg_contracts AS
-  SELECT * FROM read_parquet('data/curated/stg_contracts.parquet');
+  SELECT * FROM read_parquet('data/curated/stg_contracts/*.parquet');
 
 CREATE OR REPLACE VIEW analytics.stg_orders AS
-  SELECT * FROM read_parquet('data/curated/stg_orders.parquet');
+  SELECT * FROM read_parquet('data/curated/stg_orders/*/*.parquet', hive_partitioning = true,
+                             hive_types = {'year_month': VARCHAR});
 
 CREATE OR REPLACE VIEW analytics.stg_shipments AS
-  SELECT * FROM read_parquet('data/curated/stg_shipments.parquet');
+  SELECT * FROM read_parquet('data/curated/stg_shipments/*/*.parquet', hive_partitioning = true,
+                             hive_types = {'year_month': VARCHAR});
 
 CREATE OR REPLACE VIEW analytics.stg_inventory AS
-  SELECT * FROM read_parquet('data/curated/stg_inventory.parquet');
+  SELECT * FROM read_parquet('data/curated/stg_inventory/*/*.parquet', hive_partitioning = true,
+                             hive_types = {'year_month': VARCHAR});
+
+-- Physical layer: DATE columns, 32-bit ids, ENUMs for low-cardinality strings, a numeric
+-- shipment key, and the KPI month (year_month) stored on every fact. Facts are inserted in
+-- date order so DuckDB's per-row-group min/max zonemaps skip old data for date filters.
+DROP TYPE IF EXISTS analytics.country_t;
+CREATE TYPE analytics.country_t AS ENUM (SELECT DISTINCT country FROM analytics.stg_suppliers WHERE country IS NOT NULL ORDER BY 1);
+DROP TYPE IF EXISTS analytics.currency_t;
+CREATE TYPE analytics.currency_t AS ENUM (SELECT DISTINCT currency FROM analytics.stg_contracts WHERE currency IS NOT NULL ORDER BY 1);
+DROP TYPE IF EXISTS analytics.sku_t;
+CREATE TYPE analytics.sku_t AS ENUM (SELECT DISTINCT sku FROM analytics.stg_inventory WHERE sku IS NOT NULL ORDER BY 1);
 
 CREATE OR REPLACE TABLE analytics.dim_supplier AS
-SELECT DISTINCT supplier_id, supplier_name, country, lead_time_days, quality_score
-FROM analytics.stg_suppliers;
+SELECT DISTINCT supplier_id::INTEGER AS supplier_id, supplier_name, country::analytics.country_t AS country,
+       lead_time_days::SMALLINT AS lead_time_days, quality_score
+FROM analytics.stg_suppliers
+ORDER BY supplier_id;
 
 CREATE OR REPLACE TABLE analytics.dim_contract AS
-SELECT DISTINCT contract_id, supplier_id, start_date, end_date, committed_value, currency
-FROM analytics.stg_contracts;
+SELECT DISTINCT contract_id::INTEGER AS contract_id, supplier_id::INTEGER AS supplier_id,
+       start_date::DATE AS start_date, end_date::DATE AS end_date,
+       committed_value, currency::analytics.currency_t AS currency
+FROM analytics.stg_contracts
+ORDER BY contract_id;
 
 CREATE OR REPLACE TABLE analytics.dim_date AS
 WITH dates AS (
-  SELECT MIN(order_date) AS min_d, MAX(order_date) AS max_d FROM analytics.stg_orders
+  SELECT MIN(order_date)::DATE AS min_d, MAX(order_date)::DATE AS max_d FROM analytics.stg_orders
 )
 SELECT d::DATE AS date,
-       EXTRACT(year FROM d) AS year,
-       EXTRACT(month FROM d) AS month,
+       EXTRACT(year FROM d)::SMALLINT AS year,
+       EXTRACT(month FROM d)::TINYINT AS month,
        strftime(d, '%Y-%m') AS year_month
-FROM dates, range(dates.min_d::DATE, dates.max_d::DATE + INTERVAL 1 DAY, INTERVAL 1 DAY) t(d);
+FROM dates, range(dates.min_d, dates.max_d + INTERVAL 1 DAY, INTERVAL 1 DAY) t(d);
+
+-- Contract interval index: each supplier's timeline cut at every contract start and end into
+-- non-overlapping [valid_from, valid_to] segments, each naming the contract in force (the most
+-- recently started one where contracts overlap; NULL in gaps). Orders resolve against it with a
+-- sort-merge ASOF join instead of a supplier x date range join.
+CREATE OR REPLACE TABLE analytics.contract_interval AS
+WITH bounds AS (
+  SELECT supplier_id, start_date AS d FROM analytics.dim_contract
+  UNION
+  SELECT supplier_id, end_date + 1 FROM analytics.dim_contract
+),
+segments AS (
+  SELECT supplier_id, d AS valid_from, LEAD(d) OVER (PARTITION BY supplier_id ORDER BY d) - 1 AS valid_to
+  FROM bounds
+)
+SELECT sg.supplier_id, sg.valid_from, sg.valid_to, dc.contract_id
+FROM segments sg
+LEFT JOIN analytics.dim_contract dc
+  ON dc.supplier_id = sg.supplier_id AND sg.valid_from BETWEEN dc.start_date AND dc.end_date
+QUALIFY row_number() OVER (PARTITION BY sg.supplier_id, sg.valid_from
+                           ORDER BY dc.start_date DESC NULLS LAST, dc.contract_id) = 1
+ORDER BY sg.supplier_id, sg.valid_from;
 
+-- resolved_contract_id: the order's own contract when it is active on the order date, otherwise
+-- the supplier's contract in force that day (NULL = off-contract spend).
 CREATE OR REPLACE TABLE analytics.fact_order AS
-SELECT o.order_id, o.supplier_id, o.order_date,
-       o.qty_ordered, o.unit_price, o.contract_id,
-       (o.qty_ordered * o.unit_price) AS order_value
-FROM analytics.stg_orders o;
+SELECT o.order_id::INTEGER AS order_id, o.supplier_id::INTEGER AS supplier_id,
+       o.order_date::DATE AS order_date, o.year_month,
+       o.qty_ordered::INTEGER AS qty_ordered, o.unit_price, o.contract_id::INTEGER AS contract_id,
+       (o.qty_ordered * o.unit_price) AS order_value,
+       CASE WHEN o.order_date BETWEEN own.start_date AND own.end_date THEN own.contract_id
+            ELSE ci.contract_id END AS resolved_contract_id
+FROM analytics.stg_orders o
+LEFT JOIN analytics.dim_contract own ON own.contract_id = o.contract_id AND own.supplier_id = o.supplier_id
+ASOF LEFT JOIN analytics.contract_interval ci
+  ON ci.supplier_id = o.supplier_id AND o.order_date >= ci.valid_from
+ORDER BY o.order_date, o.supplier_id;
 
+-- shipment_id is '<order_id>-<part>'; the key packs it as order_id * 100 + part (etl/dq.py checks part <= 99).
 CREATE OR REPLACE TABLE analytics.fact_shipment AS
-SELECT s.shipment_id, s.order_id, s.supplier_id,
-       s.shipped_date, s.delivered_date, s.qty_delivered, s.defect_units
-FROM analytics.stg_shipments s;
+SELECT s.order_id::BIGINT * 100 + split_part(s.shipment_id, '-', 2)::UTINYINT AS shipment_key,
+       s.order_id::INTEGER AS order_id, split_part(s.shipment_id, '-', 2)::UTINYINT AS part_no,
+       s.supplier_id::INTEGER AS supplier_id,
+       s.shipped_date::DATE AS shipped_date, s.delivered_date::DATE AS delivered_date, s.year_month,
+       s.qty_delivered::INTEGER AS qty_delivered, s.defect_units::INTEGER AS defect_units
+FROM analytics.stg_shipments s
+ORDER BY s.delivered_date, s.supplier_id;
 
 CREATE OR REPLACE TABLE analytics.fact_inventory AS
-SELECT i.date, i.sku, i.on_hand, i.backorder
-FROM analytics.stg_inventory i;
+SELECT i.date::DATE AS date, i.year_month, i.sku::analytics.sku_t AS sku,
+       i.on_hand::INTEGER AS on_hand, i.backorder::INTEGER AS backorder
+FROM analytics.stg_inventory i
+ORDER BY i.date, i.sku;
@@ -0,0 +1,54 @@
+-- Features for supplier-days on or after `since`; rows before it are not visible to the windows.
+CREATE OR REPLACE MACRO analytics.supplier_daily_features(since) AS TABLE
+WITH delivered AS (
+  SELECT supplier_id,
+         delivered_date as d,
+         SUM(qty_delivered)::BIGINT as qty_delivered,
+         SUM(defect_units)::BIGINT as defect_units,
+         AVG(CASE WHEN delivered_date <= shipped_date + lead_time_days THEN 1.0 ELSE 0.0 END) AS on_time
+  FROM analytics.fact_shipment
+  JOIN analytics.dim_supplier USING (supplier_id)
+  WHERE delivered_date >= since
+  GROUP BY 1,2
+),
+ordered AS (
+  SELECT supplier_id,
+         order_date as d,
+         SUM(qty_ordered)::BIGINT as qty_ordered,
+         SUM(order_value) as order_value
+  FROM analytics.fact_order
+  WHERE order_date >= since
+  GROUP BY 1,2
+),
+agg AS (
+  SELECT coalesce(o.supplier_id, d.supplier_id) as supplier_id,
+         coalesce(o.d, d.d) as date,
+         coalesce(qty_ordered, 0) as qty_ordered,
+         coalesce(order_value, 0) as order_value,
+         coalesce(qty_delivered, 0) as qty_delivered,
+         coalesce(defect_units, 0) as defect_units,
+         coalesce(on_time, 0) as on_time
+  FROM ordered o
+  FULL OUTER JOIN delivered d
+  ON o.supplier_id = d.supplier_id AND o.d = d.d
+),
+rates AS (
+  SELECT *,
+         coalesce(defect_units / NULLIF(qty_delivered, 0), 0.0) AS defect_rate,
+         coalesce(qty_delivered / NULLIF(qty_ordered, 0), 0.0) AS fill_rate
+  FROM agg
+)
+SELECT supplier_id, date, qty_ordered, order_value, qty_delivered, defect_units, on_time,
+       -- late if the next 7 supplier-days (at least 3 of them) average below 80% on time
+       CASE WHEN COUNT(on_time) OVER fwd >= 3 AND AVG(on_time) OVER fwd < 0.8
+            THEN 1 ELSE 0 END AS target_late,
+       defect_rate, fill_rate,
+       AVG(on_time) OVER trail AS roll_on_time_7,
+       AVG(defect_rate) OVER trail AS roll_defect_7,
+       AVG(fill_rate) OVER trail AS roll_fill_7
+FROM rates
+WINDOW trail AS (PARTITION BY supplier_id ORDER BY date ROWS BETWEEN 6 PRECEDING AND CURRENT ROW),
+       fwd AS (PARTITION BY supplier_id ORDER BY date ROWS BETWEEN 1 FOLLOWING AND 7 FOLLOWING);
+
+CREATE OR REPLACE VIEW analytics.v_supplier_daily_features AS
+SELECT * FROM analytics.supplier_daily_features(DATE '0001-01-01');
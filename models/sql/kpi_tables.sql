@@ -0,0 +1,53 @@
+-- Materialized KPIs at supplier x month grain, maintained by models/refresh_kpis.py.
+CREATE TABLE IF NOT EXISTS analytics.kpi_supplier_ontime_monthly AS
+SELECT * FROM analytics.kpi_supplier_ontime(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS analytics.kpi_supplier_fillrate_monthly AS
+SELECT * FROM analytics.kpi_supplier_fillrate(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS analytics.kpi_contract_spend_monthly AS
+SELECT * FROM analytics.kpi_contract_spend(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS analytics.kpi_spend_leakage_monthly AS
+SELECT * FROM analytics.kpi_spend_leakage(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+-- Inventory rollups, filled in this order: weekly reads daily, monthly reads weekly. The daily
+-- columns are spelled out because kpi_inventory_by_day reads this table for the previous month.
+CREATE TABLE IF NOT EXISTS analytics.kpi_inventory_daily (
+  sku VARCHAR, date DATE, year_month VARCHAR, week_start DATE, on_hand INTEGER, backorder INTEGER,
+  stockout INTEGER, usage INTEGER, stockout_streak INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS analytics.kpi_inventory_weekly AS
+SELECT * FROM analytics.kpi_inventory_by_week(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+CREATE TABLE IF NOT EXISTS analytics.kpi_inventory_monthly AS
+SELECT * FROM analytics.kpi_inventory_by_month(DATE '0001-01-01', DATE '0001-01-01') LIMIT 0;
+
+-- Dashboard-facing rollups; cheap because they read the monthly tables, not the facts.
+CREATE OR REPLACE VIEW analytics.kpi_contract_utilization AS
+WITH spend AS (
+  SELECT contract_id, SUM(actual_spend) AS actual_spend FROM analytics.kpi_contract_spend_monthly GROUP BY 1
+)
+SELECT
+  dc.contract_id, dc.supplier_id, ds.supplier_name,
+  dc.committed_value, COALESCE(sp.actual_spend, 0) AS actual_spend,
+  COALESCE(sp.actual_spend, 0)::DOUBLE / NULLIF(dc.committed_value, 0) AS utilization_ratio
+FROM analytics.dim_contract dc
+LEFT JOIN spend sp USING (contract_id)
+JOIN analytics.dim_supplier ds USING (supplier_id);
+
+CREATE OR REPLACE VIEW analytics.kpi_spend_leakage_by_month AS
+SELECT
+  year_month,
+  SUM(spend_in_contract) AS spend_in_contract,
+  SUM(spend_outside_contract) AS spend_outside_contract,
+  SUM(total_spend) AS total_spend,
+  SUM(spend_outside_contract)::DOUBLE / NULLIF(SUM(total_spend),0) AS leakage_rate
+FROM analytics.kpi_spend_leakage_monthly
+GROUP BY 1;
+
+-- Per-month fingerprints of the facts as of the last refresh.
+CREATE TABLE IF NOT EXISTS analytics.kpi_refresh_state (
+  source VARCHAR, year_month VARCHAR, row_count BIGINT, fingerprint UBIGINT
+);
@@ -1,30 +1,26 @@
-CREATE OR REPLACE VIEW analytics.v_kpi_supplier_ontime AS
+-- KPI definitions as table macros over [lo, hi) of the KPI's own date column, so
+-- refresh_kpis.py can recompute just the months touched by a load. The views below
+-- expose the full history for ad-hoc use.
+
+CREATE OR REPLACE MACRO analytics.kpi_supplier_ontime(lo, hi) AS TABLE
 SELECT
-  s.supplier_id,
+  fsh.supplier_id,
   ds.supplier_name,
-  strftime(fsh.delivered_date, '%Y-%m') AS year_month,
-  AVG(
-    CASE 
-      WHEN CAST(fsh.delivered_date AS DATE) 
-           <= CAST(fsh.shipped_date AS DATE) + CAST(ds.lead_time_days AS INTEGER)
-      THEN 1.0 ELSE 0.0 
-    END
-  ) AS on_time_rate
+  fsh.year_month,
+  AVG(CASE WHEN fsh.delivered_date <= fsh.shipped_date + ds.lead_time_days THEN 1.0 ELSE 0.0 END) AS on_time_rate
 FROM analytics.fact_shipment fsh
 JOIN analytics.dim_supplier ds USING (supplier_id)
-JOIN analytics.fact_order fo ON fo.order_id = fsh.order_id
-JOIN analytics.dim_date dd ON dd.date = fo.order_date
-JOIN analytics.dim_supplier s USING (supplier_id)
+WHERE fsh.delivered_date >= lo AND fsh.delivered_date < hi
 GROUP BY 1,2,3;
 
-CREATE OR REPLACE VIEW analytics.v_kpi_supplier_fillrate AS
+CREATE OR REPLACE MACRO analytics.kpi_supplier_fillrate(lo, hi) AS TABLE
 WITH ord AS (
-  SELECT supplier_id, strftime(order_date, '%Y-%m') AS ym, SUM(qty_ordered) AS qty_ordered
-  FROM analytics.fact_order GROUP BY 1,2
+  SELECT supplier_id, year_month AS ym, SUM(qty_ordered) AS qty_ordered
+  FROM analytics.fact_order WHERE order_date >= lo AND order_date < hi GROUP BY 1,2
 ),
 ship AS (
-  SELECT supplier_id, strftime(delivered_date, '%Y-%m') AS ym, SUM(qty_delivered) AS qty_delivered
-  FROM analytics.fact_shipment GROUP BY 1,2
+  SELECT supplier_id, year_month AS ym, SUM(qty_delivered) AS qty_delivered
+  FROM analytics.fact_shipment WHERE delivered_date >= lo AND delivered_date < hi GROUP BY 1,2
 )
 SELECT
   o.supplier_id, ds.supplier_name, o.ym AS year_month,
@@ -33,10 +29,98 @@ FROM ord o
 LEFT JOIN ship s ON s.supplier_id = o.supplier_id AND s.ym = o.ym
 JOIN analytics.dim_supplier ds ON ds.supplier_id = o.supplier_id;
 
+-- Spend per resolved contract and order month; utilization sums this over months.
+CREATE OR REPLACE MACRO analytics.kpi_contract_spend(lo, hi) AS TABLE
+SELECT resolved_contract_id AS contract_id, supplier_id, year_month, SUM(order_value) AS actual_spend
+FROM analytics.fact_order
+WHERE resolved_contract_id IS NOT NULL AND order_date >= lo AND order_date < hi
+GROUP BY 1,2,3;
+
+-- In-contract spend is spend on orders that resolved to an active contract (see ddl.sql).
+CREATE OR REPLACE MACRO analytics.kpi_spend_leakage(lo, hi) AS TABLE
+SELECT
+  supplier_id,
+  year_month,
+  SUM(CASE WHEN resolved_contract_id IS NOT NULL THEN order_value ELSE 0 END) AS spend_in_contract,
+  SUM(CASE WHEN resolved_contract_id IS NULL THEN order_value ELSE 0 END) AS spend_outside_contract,
+  SUM(order_value) AS total_spend
+FROM analytics.fact_order
+WHERE order_date >= lo AND order_date < hi
+GROUP BY 1,2;
+
+-- Inventory health, rolled up daily -> weekly -> monthly into the kpi_inventory_* tables
+-- (kpi_tables.sql); each level reads the one below it. Weeks are cut at month ends.
+-- Continues from each SKU's last materialized day before `lo`, so usage and stockout streaks run
+-- across month ends while the refresh still goes month by month (refresh_kpis.py refreshes every
+-- month after a changed one).
+CREATE OR REPLACE MACRO analytics.kpi_inventory_by_day(lo, hi) AS TABLE
+WITH prev AS (
+  SELECT sku, arg_max(on_hand, date) AS on_hand, arg_max(stockout_streak, date) AS stockout_streak
+  FROM analytics.kpi_inventory_daily
+  -- inventory is snapshotted daily, so the last day before `lo` is in the month before it
+  WHERE date < lo AND date >= lo - INTERVAL 31 DAY
+  GROUP BY sku
+),
+days AS (
+  SELECT i.sku::VARCHAR AS sku, i.date, i.year_month,
+         GREATEST(date_trunc('week', i.date), date_trunc('month', i.date))::DATE AS week_start,
+         i.on_hand, i.backorder,
+         (i.on_hand = 0)::INTEGER AS stockout,
+         -- units drawn down since the previous day; receipts count as zero usage
+         GREATEST(COALESCE(LAG(i.on_hand) OVER (PARTITION BY i.sku ORDER BY i.date), p.on_hand) - i.on_hand, 0) AS usage,
+         COALESCE(p.stockout_streak, 0) AS prev_streak
+  FROM analytics.fact_inventory i
+  LEFT JOIN prev p ON p.sku = i.sku::VARCHAR
+  WHERE i.date >= lo AND i.date < hi
+),
+runs AS (
+  SELECT *, SUM(1 - stockout) OVER (PARTITION BY sku ORDER BY date) AS run
+  FROM days
+)
+SELECT sku, date, year_month, week_start, on_hand, backorder, stockout, usage,
+       -- consecutive stockout days ending on this date; run 0 continues the streak from before `lo`
+       (SUM(stockout) OVER (PARTITION BY sku, run ORDER BY date)
+        + CASE WHEN run = 0 THEN prev_streak ELSE 0 END)::INTEGER AS stockout_streak
+FROM runs;
+
+CREATE OR REPLACE MACRO analytics.kpi_inventory_by_week(lo, hi) AS TABLE
+SELECT sku, week_start, year_month,
+       COUNT(*)::INTEGER AS days,
+       SUM(stockout)::INTEGER AS stockout_days,
+       COUNT(*) FILTER (WHERE backorder > 0)::INTEGER AS backorder_days,
+       SUM(on_hand)::BIGINT AS on_hand_sum,
+       arg_max(on_hand, date) AS end_on_hand,
+       SUM(usage)::BIGINT AS usage_sum,
+       COUNT(usage)::INTEGER AS usage_days,
+       MAX(stockout_streak) AS max_stockout_streak
+FROM analytics.kpi_inventory_daily
+WHERE date >= lo AND date < hi
+GROUP BY sku, week_start, year_month;
+
+CREATE OR REPLACE MACRO analytics.kpi_inventory_by_month(lo, hi) AS TABLE
+SELECT sku, year_month,
+       SUM(days)::INTEGER AS days,
+       SUM(stockout_days)::INTEGER AS stockout_days,
+       SUM(backorder_days)::INTEGER AS backorder_days,
+       SUM(on_hand_sum)::BIGINT AS on_hand_sum,
+       arg_max(end_on_hand, week_start) AS end_on_hand,
+       SUM(usage_sum)::BIGINT AS usage_sum,
+       SUM(usage_days)::INTEGER AS usage_days,
+       MAX(max_stockout_streak) AS max_stockout_streak
+FROM analytics.kpi_inventory_weekly
+WHERE week_start >= lo AND week_start < hi
+GROUP BY sku, year_month;
+
+CREATE OR REPLACE VIEW analytics.v_kpi_supplier_ontime AS
+SELECT * FROM analytics.kpi_supplier_ontime(DATE '0001-01-01', DATE '9999-12-31');
+
+CREATE OR REPLACE VIEW analytics.v_kpi_supplier_fillrate AS
+SELECT * FROM analytics.kpi_supplier_fillrate(DATE '0001-01-01', DATE '9999-12-31');
+
 CREATE OR REPLACE VIEW analytics.v_kpi_contract_utilization AS
 WITH spend AS (
-  SELECT contract_id, SUM(order_value) AS actual_spend
-  FROM analytics.fact_order WHERE contract_id IS NOT NULL GROUP BY 1
+  SELECT contract_id, SUM(actual_spend) AS actual_spend
+  FROM analytics.kpi_contract_spend(DATE '0001-01-01', DATE '9999-12-31') GROUP BY 1
 )
 SELECT
   dc.contract_id, dc.supplier_id, ds.supplier_name,
@@ -47,20 +131,12 @@ LEFT JOIN spend sp USING (contract_id)
 JOIN analytics.dim_supplier ds USING (supplier_id);
 
 CREATE OR REPLACE VIEW analytics.v_kpi_spend_leakage AS
-WITH order_with_contract AS (
-  SELECT
-    fo.*, dc.start_date, dc.end_date,
-    CASE WHEN fo.contract_id IS NOT NULL
-         AND fo.order_date BETWEEN dc.start_date AND dc.end_date THEN 1 ELSE 0 END AS in_active_contract
-  FROM analytics.fact_order fo
-  LEFT JOIN analytics.dim_contract dc USING (contract_id)
-)
 SELECT
-  strftime(order_date, '%Y-%m') AS year_month,
-  SUM(CASE WHEN in_active_contract=1 THEN order_value ELSE 0 END) AS spend_in_contract,
-  SUM(CASE WHEN in_active_contract=0 THEN order_value ELSE 0 END) AS spend_outside_contract,
-  SUM(order_value) AS total_spend,
-  SUM(CASE WHEN in_active_contract=0 THEN order_value ELSE 0 END)::DOUBLE / NULLIF(SUM(order_value),0) AS leakage_rate
-FROM order_with_contract
+  year_month,
+  SUM(spend_in_contract) AS spend_in_contract,
+  SUM(spend_outside_contract) AS spend_outside_contract,
+  SUM(total_spend) AS total_spend,
+  SUM(spend_outside_contract)::DOUBLE / NULLIF(SUM(total_spend),0) AS leakage_rate
+FROM analytics.kpi_spend_leakage(DATE '0001-01-01', DATE '9999-12-31')
 GROUP BY 1
 ORDER BY 1;
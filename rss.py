@@ -0,0 +1,21 @@
+from pathlib import Path
+
+def reset_peak_rss():
+    # Linux resets the process high-water mark (VmHWM) on "5"; elsewhere peaks are cumulative.
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    # Peak since the last reset_peak_rss() where Linux supports it, else since process start.
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
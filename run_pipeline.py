@@ -1,26 +1,84 @@
-import duckdb, subprocess, sys
+import argparse, importlib, sys, time
 from pathlib import Path
+import warehouse
+from dag import Runner, Stage
 
 ROOT = Path(__file__).resolve().parent
 DATA = ROOT / "data"
-DB = DATA / "opspulse.duckdb"
+STATE_DIR = DATA / "pipeline"
+for sub in ("etl", "models", "ml"):
+    sys.path.insert(0, str(ROOT / sub))
 
-def run(cmd):
-    print(">", " ".join(cmd))
-    subprocess.check_call(cmd)
+def script(name):
+    # Stages run in this interpreter, so pandas/sklearn/duckdb are imported once and only by stages that run.
+    return importlib.import_module(name)
 
-def main():
-    run([sys.executable, str(ROOT / "etl" / "generate_data.py")])
-    run([sys.executable, str(ROOT / "etl" / "transform_validate.py")])
+def stages(args, snapshot):
+    from transform_validate import CURATED_TABLES, curated_path
+    sql = ROOT / "models" / "sql"
+    raw = [DATA / "suppliers.csv", DATA / "contracts.csv", DATA / "orders", DATA / "shipments", DATA / "inventory"]
+    curated = [curated_path(t) for t in CURATED_TABLES]
+    models = DATA / "models"
+    features = DATA / "feature_store" / "supplier_daily_features"
 
-    con = duckdb.connect(str(DB))
-    con.execute((ROOT / "models" / "sql" / "ddl.sql").read_text())
-    con.execute((ROOT / "models" / "sql" / "kpis.sql").read_text())
-    con.close()
-    print(f"[DB] DuckDB created at {DB}")
+    def curate(table):
+        return lambda: script("transform_validate").curate(table)
 
-    run([sys.executable, str(ROOT / "ml" / "train_late_model.py")])
-    print("[DONE] Pipeline completed successfully.")
+    # Raw data already on disk (e.g. from a standalone `etl/generate_data.py --scale N`) is used as is;
+    # it is only regenerated when asked to (--regenerate or an explicit --scale) or when missing.
+    generate = args.regenerate or args.scale is not None or not all(p.exists() for p in raw)
+    scale = 1.0 if args.scale is None else args.scale
+    return [
+        *([Stage("generate",
+                 lambda: script("generate_data").main(["--scale", str(scale), "--seed", str(args.seed)]),
+                 inputs=[ROOT / "etl" / "generate_data.py"], outputs=raw,
+                 params={"scale": scale, "seed": args.seed})] if generate else []),
+        *[Stage(f"curate_{table}", curate(table),
+                inputs=[ROOT / "etl" / "transform_validate.py"] + [DATA / CURATED_TABLES[table]],
+                outputs=[curated_path(table)], after=["generate"] if generate else [])
+          for table in CURATED_TABLES],
+        Stage("dq", lambda: script("dq").main([]),
+              inputs=[ROOT / "etl" / "dq.py", ROOT / "etl" / "transform_validate.py"] + curated, after=[f"curate_{t}" for t in CURATED_TABLES]),
+        Stage("warehouse", snapshot.db,
+              inputs=[ROOT / "warehouse.py", sql / "ddl.sql", sql / "kpis.sql"] + curated, after=["dq"]),
+        Stage("kpis", lambda: script("refresh_kpis").main(["--db", str(snapshot.db())]),
+              inputs=[ROOT / "models" / "refresh_kpis.py", sql / "kpis.sql", sql / "kpi_tables.sql"], after=["warehouse"]),
+        Stage("features", lambda: script("build_features").main(["--db", str(snapshot.db())]),
+              inputs=[ROOT / "ml" / "build_features.py", sql / "features.sql"], outputs=[features],
+              after=["warehouse"]),
+        Stage("train", lambda: script("train_late_model").main([]),
+              inputs=[ROOT / "ml" / "train_late_model.py", features],
+              outputs=[models / "late_shipment_model.pkl", models / "late_shipment_model.npz"],
+              after=["features"]),
+        Stage("score", lambda: script("score_suppliers").main(["--db", str(snapshot.db())]),
+              inputs=[ROOT / "ml" / "score_suppliers.py", features, models / "late_shipment_model.pkl"],
+              after=["warehouse", "train"]),
+    ]
+
+# Stages whose only output lives in the warehouse snapshot.
+WAREHOUSE_STAGES = {"warehouse", "kpis", "score"}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the OpsPulse pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument("--scale", type=float, default=None,
+                        help="regenerate the raw data at this scale factor (default: use existing raw data, else 1)")
+    parser.add_argument("--regenerate", action="store_true", help="regenerate the raw data even if it exists")
+    parser.add_argument("--seed", type=int, default=42, help="generator seed")
+    parser.add_argument("--jobs", type=int, default=4, help="stages run concurrently")
+    parser.add_argument("--force", action="store_true", help="run every stage even if its inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    snapshot = warehouse.Snapshot()
+    force = True if args.force else (set() if warehouse.current_db().exists() else WAREHOUSE_STAGES)
+    runner = Runner(stages(args, snapshot), STATE_DIR, jobs=args.jobs)
+    log = runner.run(force=force)
+    snapshot.publish()
+    runner.save()
+    ran = [s["stage"] for s in log["stages"] if s["status"] == "ran"]
+    print(f"[DAG] {len(ran)}/{len(log['stages'])} stages ran ({', '.join(ran) or 'none'}); "
+          f"run log {STATE_DIR / 'runs' / (log['run_id'] + '.json')}")
+    print(f"[DONE] Pipeline completed successfully in {time.perf_counter() - start:.2f}s.")
 
 if __name__ == "__main__":
     main()
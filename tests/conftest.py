@@ -0,0 +1,20 @@
+import subprocess, sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import benchmark
+
+@pytest.fixture(scope="session")
+def pipeline(tmp_path_factory):
+    # A small seeded run built from scratch in its own workspace; the repository's data/ is never touched.
+    ws = tmp_path_factory.mktemp("workspace")
+    benchmark.workspace(ws)
+    subprocess.run([sys.executable, "run_pipeline.py", "--scale", "2", "--seed", "7", "--jobs", "1"],
+                   cwd=ws, check=True, capture_output=True)
+    return ws
+
+@pytest.fixture(scope="session")
+def warehouse_db(pipeline):
+    return pipeline / "data" / "warehouse" / (pipeline / "data" / "CURRENT").read_text().strip()
@@ -0,0 +1,31 @@
+import duckdb
+
+# v_kpi_supplier_ontime as it read before the redundant fact_order, dim_date and second dim_supplier
+# joins were dropped.
+ORIGINAL_ONTIME = """
+SELECT
+  s.supplier_id,
+  ds.supplier_name,
+  fsh.year_month,
+  AVG(CASE WHEN fsh.delivered_date <= fsh.shipped_date + ds.lead_time_days THEN 1.0 ELSE 0.0 END) AS on_time_rate
+FROM analytics.fact_shipment fsh
+JOIN analytics.dim_supplier ds USING (supplier_id)
+JOIN analytics.fact_order fo ON fo.order_id = fsh.order_id
+JOIN analytics.dim_date dd ON dd.date = fo.order_date
+JOIN analytics.dim_supplier s USING (supplier_id)
+GROUP BY 1,2,3
+"""
+
+def rounded(sql):
+    # Doubles are rounded so summation order cannot make equal averages differ.
+    return f"SELECT supplier_id, supplier_name, year_month, round(on_time_rate, 9) AS on_time_rate FROM ({sql})"
+
+def test_ontime_view_matches_original_sql(warehouse_db):
+    con = duckdb.connect(str(warehouse_db), read_only=True)
+    try:
+        old, new = rounded(ORIGINAL_ONTIME), rounded("SELECT * FROM analytics.v_kpi_supplier_ontime")
+        assert con.execute(f"SELECT COUNT(*) FROM ({new})").fetchone()[0] > 0
+        assert con.execute(f"SELECT * FROM ({old}) EXCEPT ALL SELECT * FROM ({new})").fetchall() == []
+        assert con.execute(f"SELECT * FROM ({new}) EXCEPT ALL SELECT * FROM ({old})").fetchall() == []
+    finally:
+        con.close()
@@ -0,0 +1,26 @@
+import duckdb
+
+def reference_target_late(features):
+    # The per-supplier loop that labelled supplier-days before the label moved into features.sql.
+    features = features.copy()
+    features["target_late"] = 0
+    for sid in features["supplier_id"].unique():
+        s = features[features["supplier_id"] == sid].sort_values("date").copy()
+        for idx in range(len(s)):
+            window = s.iloc[idx+1:idx+8]["on_time"]
+            if len(window) >= 3 and window.mean() < 0.8:
+                features.loc[s.index[idx], "target_late"] = 1
+    return features["target_late"]
+
+def test_target_late_matches_reference_loop(pipeline):
+    store = (pipeline / "data" / "feature_store" / "supplier_daily_features" / "**" / "*.parquet").as_posix()
+    features = duckdb.sql(f"""
+        SELECT supplier_id, date, on_time, target_late
+        FROM read_parquet('{store}', hive_partitioning = true) ORDER BY supplier_id, date
+    """).df()
+    assert len(features) > 0
+    assert features["target_late"].nunique() == 2
+
+    expected = reference_target_late(features[["supplier_id", "date", "on_time"]])
+    mismatched = features[features["target_late"] != expected]
+    assert mismatched.empty, f"{len(mismatched)} supplier-days labelled differently:\n{mismatched.head(10)}"
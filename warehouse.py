@@ -0,0 +1,102 @@
+import os, threading, time, uuid
+import duckdb
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DATA = ROOT / "data"
+SNAPSHOTS = DATA / "warehouse"
+POINTER = DATA / "CURRENT"
+LEGACY_DB = DATA / "opspulse.duckdb"
+KEEP_SNAPSHOTS = 3
+
+# Tables maintained incrementally across builds; everything else is rebuilt by ddl.sql.
+CARRY_OVER = [
+    "kpi_supplier_ontime_monthly",
+    "kpi_supplier_fillrate_monthly",
+    "kpi_contract_spend_monthly",
+    "kpi_spend_leakage_monthly",
+    "kpi_inventory_daily",
+    "kpi_inventory_weekly",
+    "kpi_inventory_monthly",
+    "kpi_refresh_state",
+    "fact_supplier_risk",
+]
+
+def current_db():
+    # The published snapshot, or the pre-snapshot single database file if nothing was published yet.
+    if POINTER.exists():
+        name = POINTER.read_text().strip()
+        if name:
+            return SNAPSHOTS / name
+    return LEGACY_DB
+
+def build_id():
+    return current_db().name
+
+def new_snapshot():
+    SNAPSHOTS.mkdir(parents=True, exist_ok=True)
+    return SNAPSHOTS / f"opspulse-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.duckdb"
+
+def carry_over(con, previous):
+    if not previous.exists():
+        return []
+    con.execute("CREATE SCHEMA IF NOT EXISTS analytics;")
+    con.execute(f"ATTACH '{previous.as_posix()}' AS previous (READ_ONLY)")
+    existing = {r[0] for r in con.execute("""
+        SELECT table_name FROM duckdb_tables() WHERE database_name = 'previous' AND schema_name = 'analytics'
+    """).fetchall()}
+    copied = [t for t in CARRY_OVER if t in existing]
+    for t in copied:
+        con.execute(f"CREATE TABLE analytics.{t} AS SELECT * FROM previous.analytics.{t}")
+    con.execute("DETACH previous")
+    return copied
+
+def publish(snapshot):
+    # os.replace is atomic, so readers see either the old or the new snapshot name, never a partial one.
+    tmp = POINTER.with_name(POINTER.name + ".tmp")
+    tmp.write_text(snapshot.name)
+    os.replace(tmp, POINTER)
+
+def prune(keep=KEEP_SNAPSHOTS):
+    current = current_db()
+    snapshots = sorted(SNAPSHOTS.glob("opspulse-*.duckdb"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in snapshots[keep:]:
+        if old == current:
+            continue
+        try:
+            old.unlink()
+            old.with_name(old.name + ".wal").unlink(missing_ok=True)
+        except OSError:
+            pass  # still open by a dashboard on a platform that locks open files; retried next build
+
+class Snapshot:
+    # The warehouse file this run writes to. Created on first use, so a run whose warehouse stages
+    # are all up to date leaves the published snapshot untouched.
+    def __init__(self):
+        self.path = None
+        self._lock = threading.Lock()
+
+    def db(self):
+        with self._lock:
+            if self.path is None:
+                previous = current_db()
+                path = new_snapshot()
+                con = duckdb.connect(str(path))
+                carried = carry_over(con, previous)
+                con.execute((ROOT / "models" / "sql" / "ddl.sql").read_text())
+                con.execute((ROOT / "models" / "sql" / "kpis.sql").read_text())
+                con.close()
+                print(f"[DB] DuckDB snapshot created at {path} (carried over: {', '.join(carried) or 'nothing'})")
+                self.path = path
+        return self.path
+
+    def publish(self):
+        if self.path is None:
+            return False
+        con = duckdb.connect(str(self.path))
+        con.execute("CHECKPOINT")
+        con.close()
+        publish(self.path)
+        prune()
+        print(f"[DB] Published snapshot {self.path.name}")
+        return True